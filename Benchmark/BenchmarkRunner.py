@@ -0,0 +1,96 @@
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Callable
+
+import numpy as np
+
+
+class BenchmarkResult(object):
+    def __init__(self, name, unit, num_of_items, seconds, peak_memory_bytes, net_allocated_blocks):
+        self.name = name
+        self.unit = unit  # what one item is, e.g. 'steps' or 'paths'
+        self.num_of_items = num_of_items  # items processed by one call of the benchmark function
+        self.seconds = seconds  # best wall time of one call
+        self.throughput = num_of_items / seconds if seconds > 0 else float('inf')  # items per second
+        self.peak_memory_bytes = peak_memory_bytes  # peak traced Python memory during one call
+        self.net_allocated_blocks = net_allocated_blocks  # memory blocks still allocated after one call
+
+    def to_dict(self):
+        return OrderedDict([('name', self.name), ('unit', self.unit), ('num_of_items', self.num_of_items),
+                            ('seconds', self.seconds), ('throughput', self.throughput),
+                            ('peak_memory_bytes', self.peak_memory_bytes),
+                            ('net_allocated_blocks', self.net_allocated_blocks)])
+
+
+class BenchmarkRunner(object):
+    """BenchmarkRunner times registered benchmark functions, and compares the results against a stored baseline.
+    Each benchmark is called num_of_repeats times for timing and the best time is kept. Memory is measured in one
+    more call under tracemalloc, so tracing does not slow down the timed calls."""
+    MEMORY_SLACK_BYTES = 64 * 1024  # small benchmarks are not flagged for a few allocations more than the baseline
+
+    def __init__(self, num_of_repeats=3):
+        self.num_of_repeats = num_of_repeats
+        self._benchmark_dict = OrderedDict()  # Dict[name, (setup, func, num_of_items, unit)]
+        self.results = OrderedDict()  # Dict[name, BenchmarkResult]
+
+    def add(self, name, func: Callable, num_of_items, unit, setup: Callable = None):
+        # setup() builds fresh inputs for every call and is not timed, func(inputs) is the timed part
+        if name in self._benchmark_dict:
+            raise Exception(f'Benchmark {name} has been added')
+        self._benchmark_dict[name] = (setup, func, num_of_items, unit)
+
+    def run(self, name_filter=None, print_log=False):
+        for name, (setup, func, num_of_items, unit) in self._benchmark_dict.items():
+            if name_filter is not None and name_filter not in name:
+                continue
+            np.random.seed(0)
+            best_seconds = float('inf')
+            for _ in range(self.num_of_repeats):
+                inputs = setup() if setup is not None else None
+                start_time = time.perf_counter()
+                func(inputs)
+                best_seconds = min(best_seconds, time.perf_counter() - start_time)
+
+            inputs = setup() if setup is not None else None
+            allocated_blocks = sys.getallocatedblocks()
+            tracemalloc.start()
+            func(inputs)
+            _, peak_memory_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            net_allocated_blocks = sys.getallocatedblocks() - allocated_blocks
+
+            self.results[name] = BenchmarkResult(name, unit, num_of_items, best_seconds, peak_memory_bytes,
+                                                 net_allocated_blocks)
+            if print_log:
+                result = self.results[name]
+                print(f'{name}: {result.throughput:,.1f} {unit}/s, {result.seconds * 1e3:.3f} ms, '
+                      f'peak memory {result.peak_memory_bytes / 1e6:.3f} MB')
+        return self.results
+
+    def save_results(self, file_path):
+        with open(file_path, 'w') as f:
+            json.dump({'python_version': platform.python_version(), 'numpy_version': np.__version__,
+                       'machine': platform.machine(),
+                       'results': [result.to_dict() for result in self.results.values()]}, f, indent=2)
+
+    def compare_with_baseline(self, file_path, tolerance=0.2):
+        """Returns a list of regression messages. A benchmark regresses if its throughput drops or its peak memory
+        grows by more than tolerance relative to the baseline. Benchmarks missing from the baseline are skipped."""
+        with open(file_path) as f:
+            baseline_dict = {result['name']: result for result in json.load(f)['results']}
+        regressions = []
+        for name, result in self.results.items():
+            if name not in baseline_dict:
+                continue
+            baseline = baseline_dict[name]
+            if result.throughput < baseline['throughput'] * (1 - tolerance):
+                regressions.append(f'{name}: throughput {result.throughput:,.1f} {result.unit}/s, '
+                                   f'baseline {baseline["throughput"]:,.1f} {result.unit}/s')
+            if result.peak_memory_bytes > baseline['peak_memory_bytes'] * (1 + tolerance) + self.MEMORY_SLACK_BYTES:
+                regressions.append(f'{name}: peak memory {result.peak_memory_bytes:,} bytes, '
+                                   f'baseline {baseline["peak_memory_bytes"]:,} bytes')
+        return regressions
@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+
+from Benchmark.BenchmarkRunner import BenchmarkRunner
+
+# the core simulation path: products, Market.evolve and Agent.trade
+CORE_MODULE_NAMES = ['Source.Market', 'Source.Agent']
+# modules the core simulation path must not load, they are imported lazily when a routine needs them
+HEAVY_MODULE_NAMES = ['scipy', 'pandas']
+IMPORT_TIME_BUDGET_SECONDS = 0.5
+
+REPOSITORY_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEASURE_IMPORT_SCRIPT = '''
+import json, sys, time
+start_time = time.perf_counter()
+for module_name in {module_names!r}:
+    __import__(module_name)
+seconds = time.perf_counter() - start_time
+print(json.dumps({{'seconds': seconds, 'loaded_heavy_modules': [name for name in {heavy_module_names!r}
+                                                              if name in sys.modules]}}))
+'''
+
+
+def measure_import(module_names=None, heavy_module_names=None):
+    """Import module_names in a fresh interpreter, as a new simulation worker would.
+    Returns (import seconds, heavy modules which have been loaded)"""
+    script = MEASURE_IMPORT_SCRIPT.format(module_names=module_names or CORE_MODULE_NAMES,
+                                          heavy_module_names=heavy_module_names or HEAVY_MODULE_NAMES)
+    output = subprocess.run([sys.executable, '-c', script], cwd=REPOSITORY_PATH, check=True, capture_output=True,
+                            text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result['seconds'], result['loaded_heavy_modules']
+
+
+def check_import_budget(budget_seconds=IMPORT_TIME_BUDGET_SECONDS, num_of_repeats=3):
+    """Returns a list of budget violations of the core modules, the best of num_of_repeats imports is used"""
+    import_results = [measure_import() for _ in range(num_of_repeats)]
+    seconds = min(import_seconds for import_seconds, _ in import_results)
+    violations = []
+    if seconds > budget_seconds:
+        violations.append(f'importing {CORE_MODULE_NAMES} takes {seconds:.3f} s, budget {budget_seconds:.3f} s')
+    loaded_heavy_modules = import_results[0][1]
+    if loaded_heavy_modules:
+        violations.append(f'importing {CORE_MODULE_NAMES} loads {loaded_heavy_modules}')
+    return violations
+
+
+def add_import_benchmarks(runner: BenchmarkRunner):
+    # timed from outside, so it includes starting the interpreter, like spawning a simulation worker
+    runner.add('import/core', lambda inputs: measure_import(), 1, 'worker_starts')
+    return runner
@@ -0,0 +1,118 @@
+import copy
+
+import numpy as np
+
+from Benchmark.BenchmarkRunner import BenchmarkRunner
+from Source.Agent import Agent, DeltaHedger
+from Source.Market import Market, Stock, StockGeometricBrownianMotion, MockStockGeometricBrownianMotion, \
+    StockMeanRevertingGeometricBrownianMotion, StockTrendingGeometricBrownianMotion, EuropeanCallOption, \
+    EuropeanPutOption
+
+DAILY_SIGMA = 0.2 / np.sqrt(252)
+
+
+def make_stock_dict():
+    return {'Stock': Stock('stock', 100, 0, 1),
+            'StockGeometricBrownianMotion': StockGeometricBrownianMotion('stock_gbm', 100, 0, DAILY_SIGMA),
+            'MockStockGeometricBrownianMotion': MockStockGeometricBrownianMotion('mock_stock_gbm', 100, 0,
+                                                                                 DAILY_SIGMA),
+            'StockMeanRevertingGeometricBrownianMotion': StockMeanRevertingGeometricBrownianMotion(
+                'stock_mr_gbm', 100, 0, DAILY_SIGMA, 100, 0.001),
+            'StockTrendingGeometricBrownianMotion': StockTrendingGeometricBrownianMotion(
+                'stock_trending_gbm', 100, 0, DAILY_SIGMA, 0.03, 0.2)}
+
+
+def evolve_with_record(stock, num_of_steps):
+    stock.mark_current_value_to_record(0)
+    for time in range(1, num_of_steps + 1):
+        stock.evolve(time)
+        stock.mark_current_value_to_record(time)
+
+
+def make_market(num_of_stocks):
+    stock_list = [StockGeometricBrownianMotion(f'stock_{i}', 100, 0, DAILY_SIGMA) for i in range(num_of_stocks)]
+    option_list = [EuropeanCallOption(f'option_{i}', [stock], 100, 252) for i, stock in enumerate(stock_list)]
+    return Market(stock_list + option_list)
+
+
+def evolve_market(market, num_of_steps):
+    for time in range(1, num_of_steps + 1):
+        market.evolve(time)
+
+
+def make_portfolio(num_of_stocks):
+    market = Market([Stock(f'stock_{i}', 100, 0, 1) for i in range(num_of_stocks)])
+    agent = Agent('agent', {'Cash': 1e9, **{f'stock_{i}': 10 for i in range(num_of_stocks)}})
+    return market, agent
+
+
+def trade_and_evaluate(market, agent, num_of_steps):
+    for time in range(num_of_steps):
+        agent._trading_intention = {asset_name: 1 for asset_name in agent._asset if asset_name != 'Cash'}
+        agent.trade(market, time)
+        agent.mark_holding_values(market, time)
+
+
+def delta_hedging_episode(market_input, simulation_time=10):
+    """one daily delta hedging episode of HowDoesHedgingFrequencyInfluencePNL.ipynb"""
+    delta_hedging_trader = DeltaHedger('Agent', {'Cash': 10000, 'stock_gbm': 0, 'option': 10})
+    market = copy.deepcopy(market_input)
+    market.mark_current_value_to_record(0)
+    delta_hedging_trader.generate_delta_hedging_plans(market)
+    delta_hedging_trader.trade(market, 0)
+    delta_hedging_trader.mark_holding_values(market, 0)
+    for time in range(1, simulation_time + 1):
+        market.evolve(time)
+        market.mark_current_value_to_record(time)
+        delta_hedging_trader.mark_holding_values(market, time)
+        delta_hedging_trader.generate_delta_hedging_plans(market)
+        delta_hedging_trader.trade(market, time)
+    return delta_hedging_trader.historical_holding_values[simulation_time] - \
+        delta_hedging_trader.historical_holding_values[0]
+
+
+def make_delta_hedging_market():
+    stock = StockGeometricBrownianMotion('stock_gbm', 100, -0.02 / 252, DAILY_SIGMA)
+    return Market([stock, EuropeanCallOption('option', [stock], 100, 10)])
+
+
+def add_simulation_benchmarks(runner: BenchmarkRunner, num_of_steps=252, num_of_paths=1000):
+    # dynamics: per step cost of evolve, and per path cost of simulate_price_moves and simulate_price_paths
+    for class_name, stock in make_stock_dict().items():
+        runner.add(f'evolve/{class_name}', lambda inputs: evolve_with_record(inputs, num_of_steps), num_of_steps,
+                   'steps', setup=lambda stock=stock: copy.deepcopy(stock))
+        runner.add(f'simulate_price_moves/{class_name}', lambda inputs: inputs.simulate_price_moves(0, 10,
+                                                                                                    num_of_paths),
+                   num_of_paths, 'paths', setup=lambda stock=stock: copy.deepcopy(stock))
+        runner.add(f'simulate_price_paths/{class_name}', lambda inputs: inputs.simulate_price_paths(0, 10,
+                                                                                                    num_of_paths),
+                   num_of_paths, 'paths', setup=lambda stock=stock: copy.deepcopy(stock))
+
+    # option pricing: one contract, and a chain of strikes on one underlying
+    underlying = StockGeometricBrownianMotion('stock_gbm', 100, 0, DAILY_SIGMA)
+    for option_class in [EuropeanCallOption, EuropeanPutOption]:
+        option = option_class('option', [underlying], 100, 252)
+        runner.add(f'option_evolve/{option_class.__name__}',
+                   lambda inputs: [inputs.evolve(time) for time in range(num_of_steps)], num_of_steps, 'contracts',
+                   setup=lambda option=option: option)
+    strike_list = np.linspace(50, 150, 101)
+    runner.add('option_chain/EuropeanCallOption',
+               lambda inputs: [EuropeanCallOption(f'option_{strike}', [underlying], strike, 252)
+                               for strike in strike_list], len(strike_list), 'contracts')
+
+    # Market.evolve scaling with the number of products, one stock and one option each
+    for num_of_stocks in [1, 10, 100]:
+        runner.add(f'market_evolve/{2 * num_of_stocks}_products', lambda inputs: evolve_market(inputs, 10), 10,
+                   'steps', setup=lambda num_of_stocks=num_of_stocks: make_market(num_of_stocks))
+
+    # Agent trade and valuation scaling with the portfolio size
+    for num_of_stocks in [1, 10, 100]:
+        runner.add(f'agent_trade_and_evaluate/{num_of_stocks}_assets',
+                   lambda inputs: trade_and_evaluate(*inputs, 10), 10, 'steps',
+                   setup=lambda num_of_stocks=num_of_stocks: make_portfolio(num_of_stocks))
+
+    # the full daily delta hedging episode of the research notebook
+    market = make_delta_hedging_market()
+    runner.add('delta_hedging_episode', lambda inputs: [delta_hedging_episode(market) for _ in range(20)], 20,
+               'episodes')
+    return runner
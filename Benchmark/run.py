@@ -0,0 +1,38 @@
+"""Run the benchmark suite from the repository root:
+    python -m Benchmark.run --output bench_results.json
+    python -m Benchmark.run --baseline bench_baseline.json  # exits with 1 if any benchmark regresses
+A baseline is simply the output of an earlier run on the same machine.
+The run also exits with 1 if importing the core simulation modules exceeds the import time budget."""
+import argparse
+import sys
+
+from Benchmark.BenchmarkRunner import BenchmarkRunner
+from Benchmark.ImportBenchmark import IMPORT_TIME_BUDGET_SECONDS, add_import_benchmarks, check_import_budget
+from Benchmark.SimulationBenchmark import add_simulation_benchmarks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='WeTrade benchmark suite')
+    parser.add_argument('--output', help='save results as JSON to this file')
+    parser.add_argument('--baseline', help='compare results against this JSON file of an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    parser.add_argument('--filter', help='only run benchmarks whose name contains this string')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--import-budget', type=float, default=IMPORT_TIME_BUDGET_SECONDS,
+                        help='import time budget of the core simulation modules in seconds')
+    args = parser.parse_args(argv)
+
+    runner = add_simulation_benchmarks(add_import_benchmarks(BenchmarkRunner(num_of_repeats=args.repeats)))
+    runner.run(name_filter=args.filter, print_log=True)
+    if args.output:
+        runner.save_results(args.output)
+    regressions = check_import_budget(args.import_budget)
+    if args.baseline:
+        regressions += runner.compare_with_baseline(args.baseline, args.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
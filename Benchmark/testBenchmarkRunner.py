@@ -0,0 +1,36 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from Benchmark.BenchmarkRunner import BenchmarkRunner
+
+
+class TestBenchmarkRunner(TestCase):
+    def test_run_and_compare(self):
+        runner_test = BenchmarkRunner(num_of_repeats=2)
+        runner_test.add('sum', lambda inputs: sum(inputs), 1000, 'items', setup=lambda: list(range(1000)))
+        runner_test.add('list', lambda inputs: [0] * 10000, 1, 'lists')
+        with self.assertRaises(Exception):
+            runner_test.add('sum', lambda inputs: None, 1, 'items')
+
+        results = runner_test.run()
+        self.assertEqual(['sum', 'list'], list(results))
+        self.assertGreater(results['sum'].throughput, 0)
+        self.assertGreater(results['list'].peak_memory_bytes, 10000 * 8 - 1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'baseline.json')
+            runner_test.save_results(file_path)
+            self.assertEqual([], runner_test.compare_with_baseline(file_path))
+
+            # a baseline which is 10 times faster and uses 10 times less memory flags both regressions
+            with open(file_path) as f:
+                baseline = json.load(f)
+            baseline['results'][1]['throughput'] *= 10
+            baseline['results'][1]['peak_memory_bytes'] = 0
+            with open(file_path, 'w') as f:
+                json.dump(baseline, f)
+            regressions = runner_test.compare_with_baseline(file_path)
+            self.assertEqual(2, len(regressions))
+            self.assertTrue(all(regression.startswith('list') for regression in regressions))
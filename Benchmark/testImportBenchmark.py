@@ -0,0 +1,15 @@
+from unittest import TestCase
+
+from Benchmark.ImportBenchmark import measure_import, check_import_budget
+
+
+class TestImportBenchmark(TestCase):
+    def test_core_import(self):
+        # the core simulation path only imports numpy
+        seconds, loaded_heavy_modules = measure_import()
+        self.assertGreater(seconds, 0)
+        self.assertEqual([], loaded_heavy_modules)
+        self.assertEqual([], check_import_budget())
+
+        _, loaded_heavy_modules = measure_import(['Source.Market', 'pandas'])
+        self.assertEqual(['pandas'], loaded_heavy_modules)
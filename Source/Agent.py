@@ -1,7 +1,6 @@
 import copy
 from collections import OrderedDict
 from typing import Dict
-import pandas as pd
 
 from Source import Market
 import random
@@ -58,15 +57,18 @@ class Agent(object):
         self.historical_holding_values[time] = self._holding_asset_value
 
     def calculate_average_return(self):
+        import pandas as pd  # pandas is only loaded when a statistic is requested
         return pd.Series(list(self.historical_holding_values.values())).pct_change().mean()
 
     def calculate_std_return(self):
+        import pandas as pd
         return pd.Series(list(self.historical_holding_values.values())).pct_change().std()
 
     def calculate_sharpe_ratio(self):
         return self.calculate_average_return() / self.calculate_std_return()
 
     def calculate_max_drawdown(self):
+        import pandas as pd
         historical_holding_value_series = pd.Series(list(self.historical_holding_values.values()))
         return (historical_holding_value_series.cummax() - historical_holding_value_series).max()
 
@@ -80,6 +82,7 @@ class Agent(object):
         return init_asset_value
 
     def calculate_hit_rate(self):
+        import pandas as pd
         if len(self.historical_holding_values) == 1:
             return 1
         return (pd.Series(list(self.historical_holding_values.values())).pct_change().iloc[1:] >= 0).sum() /\
@@ -87,7 +90,7 @@ class Agent(object):
 
     def trade(self, market: Market, time, print_log=False):
         for asset_name, asset_trading_unit in self._trading_intention.items():
-            current_price = market.check_value(asset_name)
+            current_price = market.check_execution_price(asset_name, asset_trading_unit)
             if self._asset['Cash'] >= current_price * asset_trading_unit:
                 self._asset['Cash'] -= current_price * asset_trading_unit
                 self._asset[asset_name] += asset_trading_unit
@@ -123,7 +126,7 @@ class Agent(object):
 
 
 class HumanTrader(Agent):
-    # TODO: Human Trader has interactive interface to command line window
+    # Human traders trade interactively from a command line window by joining a session, see Source/Session.py
     def __init__(self, name, initial_asset):
         super().__init__(name, initial_asset)
 
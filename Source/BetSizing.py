@@ -0,0 +1,94 @@
+import numpy as np
+
+from Source.Market import MockStockGeometricBrownianMotion
+
+
+class BetSizingResult(object):
+    """Statistics of each simulated path, np.arrays of shape (len(sizes), len(observation_stds), num_of_paths),
+    with the definitions of Agent.calculate_average_return, calculate_std_return, calculate_sharpe_ratio and
+    calculate_max_drawdown on the path's historical holding values.
+    log_growth is log(final holding value / initial holding value) per step, -inf if the final holding value is
+    not positive. The average over paths is the growth rate which the Kelly criterion maximizes."""
+
+    def __init__(self, sizes, observation_stds, average_return, std_return, max_drawdown, log_growth):
+        self.sizes = sizes
+        self.observation_stds = observation_stds
+        self.average_return = average_return
+        self.std_return = std_return
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.sharpe_ratio = average_return / std_return  # nan for size 0, which never changes holding values
+        self.max_drawdown = max_drawdown
+        self.log_growth = log_growth
+
+    def mean(self, statistic_name):
+        """average of a statistic over paths, shape (len(sizes), len(observation_stds))"""
+        with np.errstate(invalid='ignore'):
+            return np.mean(getattr(self, statistic_name), axis=-1)
+
+    def kelly_optimal_sizes(self):
+        """for each observation_std, the size with the highest average log growth"""
+        return self.sizes[np.argmax(self.mean('log_growth'), axis=0)]
+
+
+class BetSizingOptimizer(object):
+    """BetSizingOptimizer evaluates the strategy of OptimalStockBetSizeResearch.ipynb for a grid of bet sizes and
+    observation_stds at once. Every step the agent observes next period's value with noise, as
+    Market.check_prediction, and trades +size units if the prediction is above the current value, -size units
+    otherwise, as Agent.trade: buying requires enough Cash, selling does not. Holding values are marked after trading.
+    All grid cells and paths are simulated together as arrays. They share the same price paths and observation
+    shocks, so differences between cells are not due to noise."""
+
+    def __init__(self, mock_stock: MockStockGeometricBrownianMotion, initial_cash=10000):
+        self.mock_stock = mock_stock
+        self.initial_cash = initial_cash
+
+    def run(self, sizes, observation_stds, num_of_paths=1000, num_of_steps=252, price_paths=None,
+            observation_shocks=None):
+        """price_paths: shape (num_of_paths, num_of_steps + 1), simulated by mock_stock.simulate_price_paths if None.
+        observation_shocks: standard normal draws of shape (num_of_paths, num_of_steps), drawn if None"""
+        sizes = np.asarray(sizes, dtype=float)
+        observation_stds = np.asarray(observation_stds, dtype=float)
+        if price_paths is None:
+            price_paths = self.mock_stock.simulate_price_paths(0, num_of_steps, num_of_paths)
+        num_of_paths, num_of_steps = price_paths.shape[0], price_paths.shape[1] - 1
+        if observation_shocks is None:
+            observation_shocks = np.random.standard_normal((num_of_paths, num_of_steps))
+
+        # arrays of shape (len(sizes), len(observation_stds), num_of_paths)
+        shape = (len(sizes), len(observation_stds), num_of_paths)
+        trade_size = np.broadcast_to(sizes[:, np.newaxis, np.newaxis], shape)
+        cash = np.full(shape, float(self.initial_cash))
+        position = np.zeros(shape)
+        # running statistics of returns with Welford's algorithm, so holding values are not kept
+        return_mean, return_m2 = np.zeros(shape), np.zeros(shape)
+        running_max_value, max_drawdown = np.full(shape, -np.inf), np.zeros(shape)
+        initial_holding_value = previous_holding_value = None
+        log_next_move = np.log(price_paths[:, 1:] / price_paths[:, :-1])
+        for time in range(num_of_steps):
+            current_value = price_paths[:, time]
+            # predicted value > current value, i.e. log(next value / current value) + observation noise > 0
+            is_buy = log_next_move[:, time] + observation_stds[:, np.newaxis] * observation_shocks[:, time] > 0
+            trading_unit = np.where(is_buy, trade_size, -trade_size)
+            is_executed = cash >= current_value * trading_unit
+            trading_unit = np.where(is_executed, trading_unit, 0)
+            cash -= current_value * trading_unit
+            position += trading_unit
+            holding_value = cash + position * current_value
+
+            if previous_holding_value is None:
+                initial_holding_value = holding_value
+            else:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    holding_return = holding_value / previous_holding_value - 1
+                delta = holding_return - return_mean
+                return_mean += delta / time
+                return_m2 += delta * (holding_return - return_mean)
+            np.maximum(running_max_value, holding_value, out=running_max_value)
+            np.maximum(max_drawdown, running_max_value - holding_value, out=max_drawdown)
+            previous_holding_value = holding_value
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std_return = np.sqrt(return_m2 / (num_of_steps - 2))
+            log_growth = np.where(np.all([holding_value > 0, initial_holding_value > 0], axis=0),
+                                  np.log(holding_value / initial_holding_value), -np.inf) / (num_of_steps - 1)
+        return BetSizingResult(sizes, observation_stds, return_mean, std_return, max_drawdown, log_growth)
@@ -0,0 +1,99 @@
+"""Black-Scholes on numpy arrays, with zero interest rate as in EuropeanCallOption and EuropeanPutOption.
+Inputs broadcast against each other. time_to_maturity is in years and annual_volatility is annualized, e.g.
+time_to_maturity = (expiry - time) / FinancialProduct.BUSINESS_DAYS_PER_YEAR"""
+import numpy as np
+
+
+def _norm_cdf(x):
+    from scipy.special import ndtr  # scipy is only loaded when array pricing is used
+    return ndtr(x)
+
+
+def _norm_pdf(x):
+    return np.exp(-0.5 * x * x) / np.sqrt(2 * np.pi)
+
+
+def _d_1_d_2(spot, strike, time_to_maturity, annual_volatility):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total_volatility = annual_volatility * np.sqrt(time_to_maturity)
+        d_1 = (np.log(spot / strike) + 0.5 * total_volatility ** 2) / total_volatility
+    return d_1, d_1 - total_volatility
+
+
+def black_scholes_price(spot, strike, time_to_maturity, annual_volatility, is_call=True):
+    spot, strike, time_to_maturity, annual_volatility, is_call = \
+        np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in
+                              [spot, strike, time_to_maturity, annual_volatility]], np.asarray(is_call))
+    d_1, d_2 = _d_1_d_2(spot, strike, time_to_maturity, annual_volatility)
+    call_price = spot * _norm_cdf(d_1) - strike * _norm_cdf(d_2)
+    price = np.where(is_call, call_price, call_price - spot + strike)  # put call parity
+    intrinsic_value = np.where(is_call, np.maximum(spot - strike, 0), np.maximum(strike - spot, 0))
+    return np.where((time_to_maturity > 0) & (annual_volatility > 0), price, intrinsic_value)
+
+
+def black_scholes_greeks(spot, strike, time_to_maturity, annual_volatility, is_call=True):
+    """Returns delta, gamma and vega, with the same units as Option.delta, Option.gamma and Option.vega"""
+    spot, strike, time_to_maturity, annual_volatility, is_call = \
+        np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in
+                              [spot, strike, time_to_maturity, annual_volatility]], np.asarray(is_call))
+    d_1, _ = _d_1_d_2(spot, strike, time_to_maturity, annual_volatility)
+    is_alive = (time_to_maturity > 0) & (annual_volatility > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = np.where(is_call, _norm_cdf(d_1), _norm_cdf(d_1) - 1)
+        gamma = _norm_pdf(d_1) / (spot * annual_volatility * np.sqrt(time_to_maturity))
+        vega = spot * _norm_pdf(d_1) * np.sqrt(time_to_maturity)
+    return np.where(is_alive, delta, 0), np.where(is_alive, gamma, 0), np.where(is_alive, vega, 0)
+
+
+def implied_volatility(price, spot, strike, time_to_maturity, is_call=True, tolerance=1e-10,
+                       max_num_of_iterations=100, min_volatility=1e-6, max_volatility=10.):
+    """Solves black_scholes_price(spot, strike, time_to_maturity, sigma, is_call) = price for the annual volatility
+    sigma of every element at once, to within tolerance in volatility.
+    Each iteration takes a Newton step with vega. The root is kept inside a bracket which shrinks every iteration,
+    and elements whose Newton step leaves the bracket take a bisection step instead, so the solver converges even
+    where vega is tiny. Prices outside the no arbitrage bounds, or with no time to maturity, give nan."""
+    price, spot, strike, time_to_maturity, is_call = \
+        np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in [price, spot, strike, time_to_maturity]],
+                            np.asarray(is_call))
+    intrinsic_value = np.where(is_call, np.maximum(spot - strike, 0), np.maximum(strike - spot, 0))
+    upper_bound = np.where(is_call, spot, strike)
+    is_solvable = (time_to_maturity > 0) & (price > intrinsic_value) & (price < upper_bound)
+
+    # Brenner-Subrahmanyam approximation as the initial guess
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volatility = np.sqrt(2 * np.pi / time_to_maturity) * price / spot
+    volatility = np.clip(np.nan_to_num(volatility, nan=0.2), 0.01, 3.)
+
+    # only the elements which have not converged yet are iterated on
+    active_index = np.flatnonzero(is_solvable)
+    price, spot, strike, time_to_maturity, is_call = [x.ravel()[active_index] for x in
+                                                       [price, spot, strike, time_to_maturity, is_call]]
+    active_volatility = volatility.ravel()[active_index]
+    lower_volatility = np.full(len(active_index), min_volatility)
+    upper_volatility = np.full(len(active_index), max_volatility)
+    volatility = volatility.ravel().copy()
+
+    for _ in range(max_num_of_iterations):
+        price_error = black_scholes_price(spot, strike, time_to_maturity, active_volatility, is_call) - price
+        _, _, vega = black_scholes_greeks(spot, strike, time_to_maturity, active_volatility, is_call)
+        # price increases with volatility
+        upper_volatility = np.where(price_error > 0, active_volatility, upper_volatility)
+        lower_volatility = np.where(price_error < 0, active_volatility, lower_volatility)
+        # converged once the estimated volatility error, or the bracket, is within tolerance
+        is_converged = (np.abs(price_error) <= tolerance * vega) | (upper_volatility - lower_volatility < tolerance)
+        volatility[active_index[is_converged]] = active_volatility[is_converged]
+        is_active = ~is_converged
+        if not np.any(is_active):
+            break
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            newton_volatility = active_volatility - price_error / vega
+        is_in_bracket = (newton_volatility > lower_volatility) & (newton_volatility < upper_volatility)
+        active_volatility = np.where(is_in_bracket, newton_volatility, 0.5 * (lower_volatility + upper_volatility))
+        active_index, active_volatility, lower_volatility, upper_volatility, price, spot, strike, \
+            time_to_maturity, is_call = [x[is_active] for x in
+                                         [active_index, active_volatility, lower_volatility, upper_volatility, price,
+                                          spot, strike, time_to_maturity, is_call]]
+    else:
+        volatility[active_index] = active_volatility
+
+    return np.where(is_solvable, volatility.reshape(is_solvable.shape), np.nan)
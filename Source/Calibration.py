@@ -0,0 +1,120 @@
+"""Maximum likelihood calibration of stock dynamics from price history.
+prices is an array of shape (num_of_time,) for one series or (num_of_series, num_of_time) for many series, sampled
+once per day, e.g. a product's price_record or an external file loaded by load_price_array. All series are calibrated
+together with array operations. Parameters are returned as Dict[parameter name, float or np.array of shape
+(num_of_series,)], named as the arguments of the dynamics class, so they can be passed to it as keyword arguments."""
+import numpy as np
+
+from Source.Market import FinancialProduct, Stock, StockGeometricBrownianMotion, \
+    StockMeanRevertingGeometricBrownianMotion, StockTrendingGeometricBrownianMotion
+
+
+def load_price_array(file_path):
+    """.npy files are memory mapped, so series are read lazily, .csv files have one series per row"""
+    if file_path.endswith('.npy'):
+        return np.load(file_path, mmap_mode='r')
+    return np.loadtxt(file_path, delimiter=',', ndmin=2)
+
+
+def price_record_array(financial_product: FinancialProduct):
+    return np.fromiter(financial_product.price_record.values(), dtype=float, count=len(financial_product.price_record))
+
+
+def _as_2d(prices):
+    prices = np.asarray(prices, dtype=float)
+    if prices.shape[-1] < 3:
+        raise Exception('At least 3 prices are required for calibration')
+    return np.atleast_2d(prices), prices.ndim == 1
+
+
+def _squeeze(parameters, is_one_series):
+    return {name: float(value[0]) for name, value in parameters.items()} if is_one_series else parameters
+
+
+def _regress(y, x):
+    """ordinary least squares of y = a + b * x along the last axis, which is also the maximum likelihood estimate
+    with normal noise. Returns a, b and the noise std"""
+    x_mean, y_mean = x.mean(axis=-1, keepdims=True), y.mean(axis=-1, keepdims=True)
+    b = ((x - x_mean) * (y - y_mean)).sum(axis=-1) / ((x - x_mean) ** 2).sum(axis=-1)
+    a = y_mean[..., 0] - b * x_mean[..., 0]
+    residual = y - a[..., np.newaxis] - b[..., np.newaxis] * x
+    return a, b, np.sqrt((residual ** 2).mean(axis=-1))
+
+
+def calibrate_stock(prices):
+    # price moves are N(mu, sigma), the MLE is the sample mean and std
+    prices, is_one_series = _as_2d(prices)
+    price_moves = np.diff(prices, axis=-1)
+    return _squeeze({'mu': price_moves.mean(axis=-1), 'sigma': price_moves.std(axis=-1)}, is_one_series)
+
+
+def calibrate_geometric_brownian_motion(prices):
+    # log returns are N(mu, sigma), the MLE is the sample mean and std
+    prices, is_one_series = _as_2d(prices)
+    log_returns = np.diff(np.log(prices), axis=-1)
+    return _squeeze({'mu': log_returns.mean(axis=-1), 'sigma': log_returns.std(axis=-1)}, is_one_series)
+
+
+def calibrate_mean_reverting_geometric_brownian_motion(prices, mu=0.):
+    """log returns are N(mu + mean_reversion_speed * (equilibrium_price - price), sigma), a linear regression on the
+    price. Only mu + mean_reversion_speed * equilibrium_price is identifiable, so mu is fixed (0 by default)"""
+    prices, is_one_series = _as_2d(prices)
+    log_returns = np.diff(np.log(prices), axis=-1)
+    intercept, slope, sigma = _regress(log_returns, prices[..., :-1])
+    mean_reversion_speed = -slope
+    with np.errstate(divide='ignore', invalid='ignore'):
+        equilibrium_price = (intercept - mu) / mean_reversion_speed
+    return _squeeze({'mu': np.full(len(prices), mu), 'sigma': sigma, 'equilibrium_price': equilibrium_price,
+                     'mean_reversion_speed': mean_reversion_speed}, is_one_series)
+
+
+def calibrate_trending_geometric_brownian_motion(prices, trend_decay_grid=None):
+    """log returns are N(mu + trend_scale_param * trend_factor(trend_decay_param), sigma).
+    For a given trend_decay_param this is a linear regression on the trend factor, so mu, trend_scale_param and sigma
+    are closed form. The likelihood profiled over trend_decay_param is evaluated on the whole grid for all series
+    at once, and the best grid point is kept for each series."""
+    prices, is_one_series = _as_2d(prices)
+    trend_decay_grid = np.geomspace(1e-3, 10, 61) if trend_decay_grid is None else np.asarray(trend_decay_grid)
+    log_returns = np.diff(np.log(prices), axis=-1)
+    decay = np.exp(-trend_decay_grid)[:, np.newaxis]
+    # the trend factor of StockTrendingGeometricBrownianMotion before each log return, with the records of all earlier
+    # days: trend_factor(t + 1) = exp(-trend_decay_param) * (trend_factor(t) + log return at t), trend_factor(1) = 0.
+    # Only the regression sums are kept, so memory is (num_of_decays, num_of_series) whatever the history length
+    trend_factor = np.zeros((len(trend_decay_grid), len(prices)))
+    sum_x, sum_xx, sum_xy = np.zeros_like(trend_factor), np.zeros_like(trend_factor), np.zeros_like(trend_factor)
+    # the first log return has no trend factor to regress on
+    for t in range(1, log_returns.shape[-1]):
+        trend_factor = decay * (trend_factor + log_returns[:, t - 1])
+        sum_x += trend_factor
+        sum_xx += trend_factor ** 2
+        sum_xy += trend_factor * log_returns[:, t]
+    n = log_returns.shape[-1] - 1
+    y_mean, y_variance = log_returns[:, 1:].mean(axis=-1), log_returns[:, 1:].var(axis=-1)
+    x_mean = sum_x / n
+    x_variance = np.maximum(sum_xx / n - x_mean ** 2, 0)
+    xy_covariance = sum_xy / n - x_mean * y_mean
+    with np.errstate(divide='ignore', invalid='ignore'):
+        trend_scale_param = xy_covariance / x_variance
+        residual_variance = y_variance - xy_covariance * trend_scale_param
+    # the profile log likelihood is -n * log(sigma) + const, so the best decay has the smallest sigma
+    best_index = np.argmin(np.where(np.isfinite(residual_variance), residual_variance, np.inf), axis=0)
+    series_index = np.arange(len(prices))
+    trend_scale_param = trend_scale_param[best_index, series_index]
+    return _squeeze({'mu': y_mean - trend_scale_param * x_mean[best_index, series_index],
+                     'sigma': np.sqrt(np.maximum(residual_variance[best_index, series_index], 0)),
+                     'trend_scale_param': trend_scale_param,
+                     'trend_decay_param': trend_decay_grid[best_index]}, is_one_series)
+
+
+def calibrate_financial_product(financial_product: FinancialProduct, **kwargs):
+    """calibrate the dynamics of financial_product to its own price_record"""
+    prices = price_record_array(financial_product)
+    if type(financial_product) is Stock:
+        return calibrate_stock(prices)
+    elif type(financial_product) is StockGeometricBrownianMotion:
+        return calibrate_geometric_brownian_motion(prices)
+    elif type(financial_product) is StockMeanRevertingGeometricBrownianMotion:
+        return calibrate_mean_reverting_geometric_brownian_motion(prices, **kwargs)
+    elif type(financial_product) is StockTrendingGeometricBrownianMotion:
+        return calibrate_trending_geometric_brownian_motion(prices, **kwargs)
+    raise Exception(f'Calibration of {type(financial_product).__name__} is not supported')
@@ -0,0 +1,387 @@
+"""Checkpoint and resume of Market and Agent state.
+A checkpoint only holds state, i.e. the numbers which change while a simulation runs: current values, price records,
+Greeks, running statistics of path dependent options, positions, trading intentions and histories of agents and
+populations, and the states of the global numpy and python random generators. The objects themselves are built by the simulation script as usual,
+then load_checkpoint overwrites their state, so restored values are bit-exact and the simulation continues with the
+same random numbers.
+A checkpoint is a compressed .npz file: numbers are stored in numpy arrays, with a small JSON header of names."""
+import json
+import numbers
+import os
+import random
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+
+from Source.Agent import Agent, TradingHistoryRecord, HistoricalPerformanceRecord
+from Source.Market import Market
+from Source.Population import Population, PopulationTradingHistoryRecord
+
+CHECKPOINT_FORMAT_VERSION = 3
+# attributes set up by the constructors from their arguments, e.g. names and references to other objects, which the
+# simulation script rebuilds. Any other attribute which can not be stored raises, so no state is silently dropped
+REBUILT_ATTRIBUTE_NAMES = ['name', '_name', '_names', '_index', 'asset_names', '_asset_index', 'underlyings',
+                           'underlying', 'volatility_surface', 'barrier_type', '_financial_product_dict',
+                           '_price_impact_dict']
+PERFORMANCE_RECORD_FIELDS = ['time', 'asset_return', 'trading_hit_rate', 'holding_asset_value', 'cumulative_pnl',
+                             'one_day_pnl', 'asset_sharpe_ratio', 'asset_max_drawdown']
+
+
+def _type_kind(value_type):
+    # i: int, b: bool, n: None, f: float, None if values of value_type are not scalars
+    if value_type is type(None):
+        return 'n'
+    if issubclass(value_type, (bool, np.bool_)):
+        return 'b'
+    if issubclass(value_type, numbers.Integral):
+        return 'i'
+    return 'f' if issubclass(value_type, numbers.Real) else None
+
+
+def _is_scalar(value):
+    return _type_kind(type(value)) is not None
+
+
+def _are_scalars(values):
+    # types are checked once per distinct type rather than once per value, records hold many values of one type
+    return all(_type_kind(value_type) is not None for value_type in set(map(type, values)))
+
+
+def _encode_scalars(values):
+    """Values are stored as float64, so ints are exact up to 2 ** 53.
+    Returns the array and the kinds, a single character if all values are of the same kind"""
+    values = list(values)
+    type_kinds = {value_type: _type_kind(value_type) for value_type in set(map(type, values))}
+    kinds = set(type_kinds.values())
+    if len(kinds) > 1:
+        return np.array([np.nan if value is None else value for value in values], dtype=float), \
+            ''.join(type_kinds[type(value)] for value in values)
+    kind = kinds.pop() if kinds else 'f'
+    return (np.full(len(values), np.nan) if kind == 'n' else np.fromiter(values, dtype=float, count=len(values))), \
+        kind
+
+
+def _decode_scalars(array, kinds):
+    if len(kinds) == 1:
+        if kinds == 'f':
+            return array.tolist()
+        if kinds == 'n':
+            return [None] * len(array)
+        return array.astype(np.int64 if kinds == 'i' else bool).tolist()
+    decode = {'i': int, 'b': bool, 'n': lambda _: None, 'f': float}
+    return [decode[kind](value) for value, kind in zip(array.tolist(), kinds)]
+
+
+def _encode_times(times):
+    # record times are usually evenly spaced, e.g. daily, so they are stored as (start, step, count) when exact
+    times_array, kinds = _encode_scalars(times)
+    if len(times) > 1 and kinds in ['i', 'f']:
+        step = times_array[1] - times_array[0]
+        if np.array_equal(times_array, times_array[0] + step * np.arange(len(times))):
+            return np.array([times_array[0], step, len(times)]), kinds, True
+    return times_array, kinds, False
+
+
+def _decode_times(array, kinds, is_evenly_spaced):
+    if is_evenly_spaced:
+        start, step, count = array.tolist()
+        array = start + step * np.arange(int(count))
+    return _decode_scalars(array, kinds)
+
+
+class _StateEncoder(object):
+    """Encodes the state attributes of an object into arrays, and decodes them back into the object.
+    State attributes are numbers or None, numpy arrays, tuples of numbers, dicts of numbers or of numpy arrays
+    (e.g. assets by name, running statistics), records, i.e. dicts from time to number (e.g. price_record), and
+    array records, i.e. dicts from time to numpy arrays of one shape (e.g. holding values of a population).
+    Attributes in REBUILT_ATTRIBUTE_NAMES are set up by the constructor and are not stored, other attributes raise."""
+
+    def __init__(self, arrays, prefix):
+        self.arrays = arrays
+        self.prefix = prefix
+
+    def _put(self, key, array):
+        self.arrays[f'{self.prefix}{key}'] = array
+
+    def _get(self, key):
+        return self.arrays[f'{self.prefix}{key}']
+
+    def encode(self, state_object, skipped_attribute_names=()):
+        header = {'scalars': [], 'arrays': [], 'tuples': [], 'scalar_dicts': {}, 'array_dicts': {}, 'records': {},
+                  'array_records': {}}
+        scalar_values = []
+        for attribute_name, value in vars(state_object).items():
+            if attribute_name in skipped_attribute_names or attribute_name in REBUILT_ATTRIBUTE_NAMES:
+                continue
+            if _is_scalar(value):
+                header['scalars'].append(attribute_name)
+                scalar_values.append(value)
+            elif isinstance(value, np.ndarray):
+                header['arrays'].append(attribute_name)
+                self._put(attribute_name, value.copy())
+            elif isinstance(value, tuple) and _are_scalars(value):
+                array, kinds = _encode_scalars(value)
+                header['tuples'].append([attribute_name, kinds])
+                self._put(attribute_name, array)
+            elif isinstance(value, dict) and all(isinstance(key, str) for key in value) and \
+                    _are_scalars(value.values()):
+                array, kinds = _encode_scalars(list(value.values()))
+                header['scalar_dicts'][attribute_name] = [list(value), kinds]
+                self._put(attribute_name, array)
+            elif isinstance(value, dict) and all(isinstance(key, str) for key in value) and \
+                    all(isinstance(x, np.ndarray) for x in value.values()):
+                header['array_dicts'][attribute_name] = list(value)
+                for key, array in value.items():
+                    self._put(f'{attribute_name}.{key}', array.copy())
+            elif isinstance(value, dict) and _are_scalars(value) and _are_scalars(value.values()):
+                times_array, time_kind, is_evenly_spaced = _encode_times(list(value))
+                values_array, value_kinds = _encode_scalars(list(value.values()))
+                header['records'][attribute_name] = [time_kind, is_evenly_spaced, value_kinds]
+                self._put(f'{attribute_name}.time', times_array)
+                self._put(f'{attribute_name}.value', values_array)
+            elif isinstance(value, dict) and _are_scalars(value) and \
+                    all(isinstance(x, np.ndarray) for x in value.values()) and \
+                    len(set(x.shape for x in value.values())) == 1:
+                times_array, time_kind, is_evenly_spaced = _encode_times(list(value))
+                header['array_records'][attribute_name] = [time_kind, is_evenly_spaced]
+                self._put(f'{attribute_name}.time', times_array)
+                self._put(f'{attribute_name}.value', np.stack(list(value.values())))
+            else:
+                raise Exception(f'{type(state_object).__name__}.{attribute_name} of type {type(value).__name__} '
+                                f'can not be stored in a checkpoint')
+        scalar_array, scalar_kinds = _encode_scalars(scalar_values)
+        header['scalar_kinds'] = scalar_kinds
+        self._put('scalars', scalar_array)
+        return header
+
+    def decode(self, state_object, header):
+        for attribute_name, value in zip(header['scalars'],
+                                         _decode_scalars(self._get('scalars'), header['scalar_kinds'])):
+            setattr(state_object, attribute_name, value)
+        for attribute_name in header['arrays']:
+            setattr(state_object, attribute_name, self._get(attribute_name).copy())
+        for attribute_name, kinds in header['tuples']:
+            setattr(state_object, attribute_name, tuple(_decode_scalars(self._get(attribute_name), kinds)))
+        for attribute_name, (keys, kinds) in header['scalar_dicts'].items():
+            # updated in place, so the dict type (e.g. defaultdict) is kept
+            state_dict = getattr(state_object, attribute_name)
+            state_dict.clear()
+            state_dict.update(zip(keys, _decode_scalars(self._get(attribute_name), kinds)))
+        for attribute_name, keys in header['array_dicts'].items():
+            setattr(state_object, attribute_name, {key: self._get(f'{attribute_name}.{key}').copy() for key in keys})
+        for attribute_name, (time_kind, is_evenly_spaced, value_kinds) in header['records'].items():
+            record = getattr(state_object, attribute_name)
+            record.clear()
+            record.update(zip(_decode_times(self._get(f'{attribute_name}.time'), time_kind, is_evenly_spaced),
+                              _decode_scalars(self._get(f'{attribute_name}.value'), value_kinds)))
+        for attribute_name, (time_kind, is_evenly_spaced) in header['array_records'].items():
+            record = getattr(state_object, attribute_name)
+            record.clear()
+            record.update(zip(_decode_times(self._get(f'{attribute_name}.time'), time_kind, is_evenly_spaced),
+                              self._get(f'{attribute_name}.value').copy()))
+
+
+def _encode_trading_history(arrays, prefix, trading_history: List[TradingHistoryRecord]):
+    asset_names = sorted(set(record.asset_name for record in trading_history))
+    asset_index = {asset_name: i for i, asset_name in enumerate(asset_names)}
+    time_array, time_kinds = _encode_scalars([record.time for record in trading_history])
+    unit_array, unit_kinds = _encode_scalars([record.unit for record in trading_history])
+    arrays[f'{prefix}trading_history.time'] = time_array
+    arrays[f'{prefix}trading_history.unit'] = unit_array
+    arrays[f'{prefix}trading_history.asset'] = np.array([asset_index[record.asset_name]
+                                                         for record in trading_history], dtype=np.int32)
+    return [asset_names, time_kinds, unit_kinds]
+
+
+def _decode_trading_history(arrays, prefix, header):
+    asset_names, time_kinds, unit_kinds = header
+    return [TradingHistoryRecord(time, asset_names[asset_index], unit) for time, asset_index, unit in
+            zip(_decode_scalars(arrays[f'{prefix}trading_history.time'], time_kinds),
+                arrays[f'{prefix}trading_history.asset'].tolist(),
+                _decode_scalars(arrays[f'{prefix}trading_history.unit'], unit_kinds))]
+
+
+def _encode_historical_performance(arrays, prefix, historical_performance):
+    values = [getattr(record, field) for record in historical_performance.values()
+              for field in PERFORMANCE_RECORD_FIELDS]
+    array, kinds = _encode_scalars(values)
+    arrays[f'{prefix}historical_performance'] = array
+    return [list(historical_performance), kinds]
+
+
+def _decode_historical_performance(arrays, prefix, header):
+    times, kinds = header
+    values = _decode_scalars(arrays[f'{prefix}historical_performance'], kinds)
+    num_of_fields = len(PERFORMANCE_RECORD_FIELDS)
+    return OrderedDict((time, HistoricalPerformanceRecord(*values[i * num_of_fields:(i + 1) * num_of_fields]))
+                       for i, time in enumerate(times))
+
+
+def _encode_population_trading_history(arrays, prefix, trading_history: List[PopulationTradingHistoryRecord]):
+    # every record holds the executed units of all agents in all assets of the population
+    time_array, time_kinds = _encode_scalars([record.time for record in trading_history])
+    arrays[f'{prefix}trading_history.time'] = time_array
+    arrays[f'{prefix}trading_history.units'] = np.stack([record.units for record in trading_history]) \
+        if trading_history else np.zeros(0)
+    return [time_kinds]
+
+
+def _decode_population_trading_history(arrays, prefix, header, asset_names):
+    time_kinds, = header
+    return [PopulationTradingHistoryRecord(time, asset_names, units.copy()) for time, units in
+            zip(_decode_scalars(arrays[f'{prefix}trading_history.time'], time_kinds),
+                arrays[f'{prefix}trading_history.units'])]
+
+
+def _agent_names(agent):
+    # a population is identified by the names of all its agents
+    return list(agent._names) if isinstance(agent, Population) else agent._name
+
+
+AGENT_SPECIAL_ATTRIBUTE_NAMES = ['_trading_history', 'historical_performance']
+
+
+def capture_checkpoint(market: Market, agent_list: List[Agent], time):
+    """Returns the state as Dict[key, np.array], which does not share memory with the simulation, so it can be
+    written to disk while the simulation goes on"""
+    arrays = {}
+    header = {'format_version': CHECKPOINT_FORMAT_VERSION, 'time': time, 'products': [], 'agents': []}
+    header['market'] = _StateEncoder(arrays, 'market.').encode(market)
+    for i, financial_product in enumerate(market._financial_product_dict.values()):
+        header['products'].append([financial_product.name,
+                                   _StateEncoder(arrays, f'product_{i}.').encode(financial_product)])
+    for i, agent in enumerate(agent_list):
+        prefix = f'agent_{i}.'
+        agent_header = _StateEncoder(arrays, prefix).encode(agent, AGENT_SPECIAL_ATTRIBUTE_NAMES)
+        if isinstance(agent, Population):
+            header['agents'].append([_agent_names(agent), agent_header,
+                                     _encode_population_trading_history(arrays, prefix, agent._trading_history),
+                                     None])
+        else:
+            header['agents'].append([_agent_names(agent), agent_header,
+                                     _encode_trading_history(arrays, prefix, agent._trading_history),
+                                     _encode_historical_performance(arrays, prefix, agent.historical_performance)])
+    bit_generator_name, keys, position, has_gauss, cached_gaussian = np.random.get_state()
+    header['random_state'] = [bit_generator_name, position, has_gauss, cached_gaussian]
+    # python's random module is used by agents, e.g. RandomAITrader
+    python_random_version, python_random_internal_state, python_random_gauss_next = random.getstate()
+    header['python_random_state'] = [python_random_version, python_random_gauss_next]
+    # the many small float arrays (scalars, records) are packed into one array, numpy arrays of state attributes and
+    # other dtypes are stored as they are
+    packed_keys = [key for key, array in arrays.items() if array.dtype == np.float64 and array.ndim == 1]
+    packed_lengths = [len(arrays[key]) for key in packed_keys]
+    header['packed'] = [packed_keys, packed_lengths]
+    checkpoint_arrays = {key: array for key, array in arrays.items() if array.dtype != np.float64 or array.ndim != 1}
+    checkpoint_arrays['packed'] = np.concatenate([arrays[key] for key in packed_keys]) if packed_keys else \
+        np.zeros(0)
+    checkpoint_arrays['random_state.keys'] = keys
+    checkpoint_arrays['python_random_state.internal'] = np.array(python_random_internal_state, dtype=np.uint32)
+    checkpoint_arrays['header'] = np.frombuffer(json.dumps(header).encode(), dtype=np.uint8)
+    return checkpoint_arrays
+
+
+def write_checkpoint(file_path, arrays):
+    # written to a temporary file first, so a crash while writing never corrupts the previous checkpoint.
+    # Price records and trading histories compress well, e.g. repeated units and times
+    with open(file_path + '.tmp', 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(file_path + '.tmp', file_path)
+
+
+def save_checkpoint(file_path, market: Market, agent_list: List[Agent], time):
+    write_checkpoint(file_path, capture_checkpoint(market, agent_list, time))
+
+
+def load_checkpoint(file_path, market: Market, agent_list: List[Agent], restore_random_state=True):
+    """Restores the state saved in file_path into market and agent_list, which should have been built with the same
+    financial products and agents, in the same order. Returns the time of the checkpoint"""
+    with np.load(file_path, allow_pickle=False) as npz_file:
+        arrays = {key: npz_file[key] for key in npz_file.files}
+    header = json.loads(arrays['header'].tobytes().decode())
+    if header['format_version'] != CHECKPOINT_FORMAT_VERSION:
+        raise Exception(f'Checkpoint format version {header["format_version"]} is not supported')
+    packed_keys, packed_lengths = header['packed']
+    arrays.update(zip(packed_keys, np.split(arrays.pop('packed'), np.cumsum(packed_lengths)[:-1])))
+    if [name for name, _ in header['products']] != list(market._financial_product_dict):
+        raise Exception('The financial products in the market are different from the checkpoint')
+    if [name for name, *_ in header['agents']] != [_agent_names(agent) for agent in agent_list]:
+        raise Exception('The agents are different from the checkpoint')
+
+    _StateEncoder(arrays, 'market.').decode(market, header['market'])
+    for i, (financial_product, (_, product_header)) in enumerate(zip(market._financial_product_dict.values(),
+                                                                    header['products'])):
+        _StateEncoder(arrays, f'product_{i}.').decode(financial_product, product_header)
+    for i, (agent, (_, agent_header, trading_history_header, performance_header)) in enumerate(
+            zip(agent_list, header['agents'])):
+        prefix = f'agent_{i}.'
+        _StateEncoder(arrays, prefix).decode(agent, agent_header)
+        if isinstance(agent, Population):
+            agent._trading_history = _decode_population_trading_history(arrays, prefix, trading_history_header,
+                                                                        agent.asset_names)
+        else:
+            agent._trading_history = _decode_trading_history(arrays, prefix, trading_history_header)
+            agent.historical_performance = _decode_historical_performance(arrays, prefix, performance_header)
+    if restore_random_state:
+        bit_generator_name, position, has_gauss, cached_gaussian = header['random_state']
+        np.random.set_state((bit_generator_name, arrays['random_state.keys'], position, has_gauss, cached_gaussian))
+        python_random_version, python_random_gauss_next = header['python_random_state']
+        random.setstate((python_random_version, tuple(arrays['python_random_state.internal'].tolist()),
+                         python_random_gauss_next))
+    return header['time']
+
+
+class CheckpointWriter(object):
+    """Writes a checkpoint every checkpoint_interval days of simulation time.
+    The state is captured in the step loop, which only copies numbers into arrays, and the file is written by a
+    background thread, so the simulation does not wait for the disk. Only the latest num_of_kept_checkpoints files
+    are kept.
+        writer = CheckpointWriter('checkpoints', checkpoint_interval=10)
+        for time in range(1, 1000):
+            market.evolve(time)
+            ...
+            writer.checkpoint(market, agent_list, time)
+        writer.close()"""
+
+    def __init__(self, checkpoint_directory, checkpoint_interval=1, num_of_kept_checkpoints=2):
+        self.checkpoint_directory = checkpoint_directory
+        self.checkpoint_interval = checkpoint_interval
+        self.num_of_kept_checkpoints = num_of_kept_checkpoints
+        self._last_checkpoint_time = None
+        self._written_file_paths = []
+        self._pending_write = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        os.makedirs(checkpoint_directory, exist_ok=True)
+
+    def checkpoint(self, market: Market, agent_list: List[Agent], time, force=False):
+        """Returns True if a checkpoint is taken at time"""
+        if not force and self._last_checkpoint_time is not None and \
+                time - self._last_checkpoint_time < self.checkpoint_interval:
+            return False
+        arrays = capture_checkpoint(market, agent_list, time)
+        self.wait()  # at most one write is in flight, so checkpoints are written in order
+        self._pending_write = self._executor.submit(self._write, arrays, time)
+        self._last_checkpoint_time = time
+        return True
+
+    def _write(self, arrays, time):
+        file_path = os.path.join(self.checkpoint_directory, f'checkpoint_{time}.npz')
+        write_checkpoint(file_path, arrays)
+        self._written_file_paths.append(file_path)
+        while len(self._written_file_paths) > self.num_of_kept_checkpoints:
+            os.remove(self._written_file_paths.pop(0))
+
+    def wait(self):
+        # wait for the pending write, and raise its error if the write failed
+        if self._pending_write is not None:
+            self._pending_write.result()
+            self._pending_write = None
+
+    def latest_checkpoint_path(self):
+        self.wait()
+        return self._written_file_paths[-1] if self._written_file_paths else None
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown()
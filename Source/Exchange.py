@@ -0,0 +1,137 @@
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+
+from Source.Market import Market, FinancialProduct
+from Source.Population import Population
+
+
+class PriceImpact(object):
+    """PriceImpact decides how a net flow of units moves the price of a financial product.
+    unit > 0 means net buying, unit < 0 means net selling"""
+
+    def execution_price(self, value, unit):
+        """the price per unit at which the net flow is filled"""
+        return value
+
+    def price_after_flow(self, value, unit):
+        """the value of the financial product once the net flow has been filled"""
+        return value
+
+
+class LinearPriceImpact(PriceImpact):
+    """Parametric impact: the flow is filled at value * exp(temporary_impact * unit), and moves the value to
+    value * exp(permanent_impact * unit)"""
+
+    def __init__(self, temporary_impact, permanent_impact):
+        self.temporary_impact = temporary_impact
+        self.permanent_impact = permanent_impact
+
+    def execution_price(self, value, unit):
+        return value * np.exp(self.temporary_impact * unit)
+
+    def price_after_flow(self, value, unit):
+        return value * np.exp(self.permanent_impact * unit)
+
+
+class LimitOrderBook(PriceImpact):
+    """Resting limit orders on num_of_levels price levels on each side of the value, tick_size apart.
+    level_depth is the number of units resting on each level, a number or an array with one entry per level.
+    Net buying walks up the ask levels, net selling walks down the bid levels. Units beyond the whole book are
+    filled at the deepest level. The value moves to the last level touched, and the book is refilled every step."""
+
+    def __init__(self, tick_size, level_depth, num_of_levels=10):
+        self.tick_size = tick_size
+        self.level_offset = tick_size * np.arange(1, num_of_levels + 1)
+        self.level_depth = np.array(np.broadcast_to(level_depth, (num_of_levels,)), dtype=float)
+        self._cumulative_depth = np.cumsum(self.level_depth)
+
+    def _filled_units(self, unit):
+        # units filled on each level
+        filled_units = np.clip(abs(unit) - (self._cumulative_depth - self.level_depth), 0, self.level_depth)
+        filled_units[-1] += max(abs(unit) - self._cumulative_depth[-1], 0)
+        return filled_units
+
+    def execution_price(self, value, unit):
+        if unit == 0:
+            return value
+        return value + np.sign(unit) * np.dot(self._filled_units(unit), self.level_offset) / abs(unit)
+
+    def price_after_flow(self, value, unit):
+        if unit == 0:
+            return value
+        last_level = np.searchsorted(self._cumulative_depth, abs(unit))
+        return max(value + np.sign(unit) * self.level_offset[min(last_level, len(self.level_offset) - 1)], 0)
+
+
+class ImpactMarket(Market):
+    """A Market where agents' trades move prices.
+    execute aggregates the trading intentions of all agents (Agent or Population) into one net flow per financial
+    product, fills every agent at the price of the net flow, and the net flow moves the product's value before the
+    next evolve. Products without a PriceImpact are traded at their value as in Market."""
+
+    def __init__(self, financial_product_list: List[FinancialProduct], price_impact_dict: Dict[str, PriceImpact]):
+        super().__init__(financial_product_list)
+        for financial_product_name in price_impact_dict:
+            if financial_product_name not in self._financial_product_dict:
+                raise Exception(f'{financial_product_name} with price impact is NOT in the market')
+        self._price_impact_dict = price_impact_dict
+        self._execution_price = {}  # Dict[financial_product_name, price], prices of the current step's net flow
+        self._net_flow = defaultdict(float)  # Dict[financial_product_name, net units] not applied to values yet
+
+    @staticmethod
+    def aggregate_trading_intentions(agent_list):
+        net_flow = defaultdict(float)
+        for agent in agent_list:
+            if isinstance(agent, Population):
+                for asset_name, asset_trading_unit in zip(agent.asset_names, agent._trading_intention.sum(axis=0)):
+                    net_flow[asset_name] += asset_trading_unit
+            else:
+                for asset_name, asset_trading_unit in agent._trading_intention.items():
+                    net_flow[asset_name] += asset_trading_unit
+        return net_flow
+
+    def match(self, agent_list):
+        # every order of a step is filled at the price of the submitted net flow
+        for financial_product_name, unit in self.aggregate_trading_intentions(agent_list).items():
+            if financial_product_name in self._price_impact_dict:
+                self._execution_price[financial_product_name] = self._price_impact_dict[financial_product_name]\
+                    .execution_price(self.check_value(financial_product_name), unit)
+
+    def _add_executed_flow(self, financial_product_name, unit):
+        if financial_product_name in self._price_impact_dict:
+            self._net_flow[financial_product_name] += unit
+
+    def execute(self, agent_list, time, print_log=False):
+        """only executed units move the value, orders cancelled for lack of Cash do not"""
+        self.match(agent_list)
+        for agent in agent_list:
+            if isinstance(agent, Population):
+                agent.trade(self, time)
+                executed_record = agent._trading_history[-1]
+                for asset_name, unit in zip(executed_record.asset_names, executed_record.units.sum(axis=0)):
+                    self._add_executed_flow(asset_name, unit)
+            else:
+                num_of_trading_records = len(agent._trading_history)
+                agent.trade(self, time, print_log)
+                for record in agent._trading_history[num_of_trading_records:]:
+                    self._add_executed_flow(record.asset_name, record.unit)
+        self._execution_price = {}
+
+    def check_execution_price(self, financial_product_name, unit):
+        if financial_product_name in self._execution_price:
+            return self._execution_price[financial_product_name]
+        elif financial_product_name in self._price_impact_dict:
+            # trading outside execute is filled alone, its flow does not move the value
+            return self._price_impact_dict[financial_product_name].execution_price(
+                self.check_value(financial_product_name), unit)
+        return super().check_execution_price(financial_product_name, unit)
+
+    def evolve(self, time=0, dt=1):
+        for financial_product_name, unit in self._net_flow.items():
+            financial_product = self._financial_product_dict[financial_product_name]
+            financial_product.current_value = self._price_impact_dict[financial_product_name]\
+                .price_after_flow(financial_product.current_value, unit)
+        self._net_flow = defaultdict(float)
+        super().evolve(time, dt)
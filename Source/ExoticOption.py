@@ -0,0 +1,171 @@
+import numpy as np
+
+from Source.Market import Option
+
+
+class PathDependentOption(Option):
+    """PathDependentOption is priced by batched Monte Carlo over its underlying's dynamics.
+    The payoff depends on the whole price path, but only running statistics of the path are kept (running average,
+    running max/min, knock flags), as arrays with one entry per trail. Each simulated step updates them in O(trails),
+    so price_record is never scanned.
+    The observed path is the underlying's value at each evolve time, from time 0 to expiry. The future path is
+    simulated in daily steps up to expiry, the first step being shorter if time is not a whole number of days before
+    expiry, with mu and sigma scaled to its length.
+    delta is estimated by bumping the current underlying value with common random numbers, gamma and vega are 0."""
+    DELTA_BUMP = 0.01  # relative bump of the underlying value
+
+    def __init__(self, name, underlyings, strike, expiry, num_of_trails=1e4):
+        super().__init__(name, underlyings, strike, expiry)
+        self.num_of_trails = int(num_of_trails)
+        self._realized_statistics = self._initial_statistics(1)  # statistics of the observed path before now
+        self._last_observation = None  # (time, underlying value) of the latest evolve
+        self.evolve(0)
+        self.initial_value = self.current_value
+
+    def _initial_statistics(self, num_of_trails):
+        """running statistics of an empty path, Dict[statistic_name, np.array of shape (num_of_trails,)]"""
+        raise NotImplementedError
+
+    def _update_statistics(self, statistics, values):
+        """update the running statistics in place with the next observed values of the underlying"""
+        raise NotImplementedError
+
+    def _statistics_payoff(self, statistics, final_values):
+        raise NotImplementedError
+
+    def _broadcast_realized_statistics(self, num_of_trails):
+        return {key: np.repeat(value, num_of_trails) for key, value in self._realized_statistics.items()}
+
+    def payoff(self, underlying_paths):
+        # paths start at the current underlying value, the path observed before now is taken from realized statistics
+        statistics = self._broadcast_realized_statistics(len(underlying_paths))
+        for step in range(underlying_paths.shape[1]):
+            self._update_statistics(statistics, underlying_paths[:, step])
+        return self._statistics_payoff(statistics, underlying_paths[:, -1])
+
+    def evolve(self, time=0, dt=1):
+        # the value only depends on the observed path and the time to expiry, so dt is not needed
+        if not hasattr(self.underlying, 'sigma'):
+            raise Exception('underlying should have volatility parameter sigma')
+
+        if time > self.expiry and self.expiry_value is not None:
+            self.delta = 0
+            self.current_value = self.expiry_value
+            return
+
+        if self._last_observation is not None and time > self._last_observation[0]:
+            self._update_statistics(self._realized_statistics, np.array([self._last_observation[1]]))
+        self._last_observation = (time, self.underlying.current_value)
+
+        if self.expiry - time < 1e-6:
+            # settled at the first evolve at or after expiry, as updates may step over it, e.g. every 0.3 day
+            statistics = self._broadcast_realized_statistics(1)
+            final_values = np.array([self.underlying.current_value])
+            self._update_statistics(statistics, final_values)
+            self.delta = 0
+            self.current_value = float(self._statistics_payoff(statistics, final_values)[0])
+            self.expiry_value = self.current_value
+            return
+
+        # simulate the current, bumped up and bumped down underlying values together with the same shocks
+        current_underlying_value = self.underlying.current_value
+        bump = self.DELTA_BUMP * current_underlying_value
+        values = np.repeat([current_underlying_value, current_underlying_value + bump,
+                            current_underlying_value - bump], self.num_of_trails)
+        statistics = self._broadcast_realized_statistics(len(values))
+        self._update_statistics(statistics, values)
+        num_of_steps = int(np.ceil(self.expiry - time - 1e-6))
+        first_step_dt = self.expiry - time - (num_of_steps - 1)
+        path_state = self.underlying._initial_path_state(time, len(values), first_step_dt)
+        for step in range(num_of_steps):
+            random_shocks = np.tile(np.random.standard_normal(self.num_of_trails), 3)
+            step_dt = first_step_dt if step == 0 else 1
+            values = self.underlying._evolve_paths(values, time + first_step_dt + step, random_shocks, path_state,
+                                                   step_dt)
+            self._update_statistics(statistics, values)
+
+        value, value_bump_up, value_bump_down = \
+            self._statistics_payoff(statistics, values).reshape(3, self.num_of_trails).mean(axis=1)
+        self.current_value = value
+        self.delta = (value_bump_up - value_bump_down) / (2 * bump)
+
+
+class AsianCallOption(PathDependentOption):
+    """pays max(arithmetic average of the observed path - strike, 0)"""
+
+    def _initial_statistics(self, num_of_trails):
+        return {'running_sum': np.zeros(num_of_trails), 'num_of_observations': np.zeros(num_of_trails)}
+
+    def _update_statistics(self, statistics, values):
+        statistics['running_sum'] += values
+        statistics['num_of_observations'] += 1
+
+    def _statistics_payoff(self, statistics, final_values):
+        return np.maximum(statistics['running_sum'] / statistics['num_of_observations'] - self.strike, 0)
+
+
+class AsianPutOption(AsianCallOption):
+    """pays max(strike - arithmetic average of the observed path, 0)"""
+
+    def _statistics_payoff(self, statistics, final_values):
+        return np.maximum(self.strike - statistics['running_sum'] / statistics['num_of_observations'], 0)
+
+
+class LookbackCallOption(PathDependentOption):
+    """fixed strike lookback, pays max(running max of the observed path - strike, 0)"""
+
+    def _initial_statistics(self, num_of_trails):
+        return {'running_max': np.full(num_of_trails, -np.inf), 'running_min': np.full(num_of_trails, np.inf)}
+
+    def _update_statistics(self, statistics, values):
+        np.maximum(statistics['running_max'], values, out=statistics['running_max'])
+        np.minimum(statistics['running_min'], values, out=statistics['running_min'])
+
+    def _statistics_payoff(self, statistics, final_values):
+        return np.maximum(statistics['running_max'] - self.strike, 0)
+
+
+class LookbackPutOption(LookbackCallOption):
+    """fixed strike lookback, pays max(strike - running min of the observed path, 0)"""
+
+    def _statistics_payoff(self, statistics, final_values):
+        return np.maximum(self.strike - statistics['running_min'], 0)
+
+
+class BarrierOption(PathDependentOption):
+    """European option which is knocked in or out once the observed path touches the barrier.
+    barrier_type: 'up-and-out', 'up-and-in', 'down-and-out' or 'down-and-in'"""
+    BARRIER_TYPES = ['up-and-out', 'up-and-in', 'down-and-out', 'down-and-in']
+
+    def __init__(self, name, underlyings, strike, expiry, barrier, barrier_type, num_of_trails=1e4):
+        if barrier_type not in BarrierOption.BARRIER_TYPES:
+            raise Exception(f'barrier_type should be one of {BarrierOption.BARRIER_TYPES}')
+        self.barrier = barrier
+        self.barrier_type = barrier_type
+        super().__init__(name, underlyings, strike, expiry, num_of_trails)
+
+    def _initial_statistics(self, num_of_trails):
+        return {'knocked': np.zeros(num_of_trails, dtype=bool)}
+
+    def _update_statistics(self, statistics, values):
+        if self.barrier_type.startswith('up'):
+            statistics['knocked'] |= values >= self.barrier
+        else:
+            statistics['knocked'] |= values <= self.barrier
+
+    def _vanilla_payoff(self, final_values):
+        raise NotImplementedError
+
+    def _statistics_payoff(self, statistics, final_values):
+        is_alive = ~statistics['knocked'] if self.barrier_type.endswith('out') else statistics['knocked']
+        return np.where(is_alive, self._vanilla_payoff(final_values), 0)
+
+
+class BarrierCallOption(BarrierOption):
+    def _vanilla_payoff(self, final_values):
+        return np.maximum(final_values - self.strike, 0)
+
+
+class BarrierPutOption(BarrierOption):
+    def _vanilla_payoff(self, final_values):
+        return np.maximum(self.strike - final_values, 0)
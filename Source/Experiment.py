@@ -0,0 +1,170 @@
+import copy
+import hashlib
+import inspect
+import itertools
+import json
+import os
+import pickle
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from Source.Agent import DeltaHedger
+from Source.Market import Market, StockGeometricBrownianMotion, EuropeanCallOption, EuropeanPutOption
+
+SOURCE_PATH = os.path.dirname(os.path.abspath(__file__))
+HEDGING_METHODS = ['daily_delta_hedging', 'initial_delta_hedging', 'no_delta_hedging']
+OPTION_TYPES = ['call', 'put']
+
+
+def source_code_version(file_paths=None):
+    """hash of the simulation source code, so cached results are recomputed once the code changes"""
+    if file_paths is None:
+        file_paths = sorted(os.path.join(SOURCE_PATH, file_name) for file_name in os.listdir(SOURCE_PATH)
+                            if file_name.endswith('.py') and not file_name.startswith('test'))
+    code_hash = hashlib.sha256()
+    for file_path in file_paths:
+        with open(file_path, 'rb') as f:
+            code_hash.update(f.read())
+    return code_hash.hexdigest()
+
+
+class ExperimentCell(object):
+    def __init__(self, parameters: Dict, seed, result=None, is_cached=False):
+        self.parameters = parameters
+        self.seed = seed
+        self.result = result
+        self.is_cached = is_cached
+
+
+def _run_cell(cell_function: Callable, parameters: Dict, seed):
+    # seeds the global numpy and python generators, products draw from numpy and some agents, e.g. RandomAITrader,
+    # from python's random module
+    np.random.seed(seed)
+    random.seed(seed)
+    return cell_function(**parameters)
+
+
+class ExperimentRunner(object):
+    """ExperimentRunner runs cell_function(**parameters) for every cell of a parameter grid and every seed.
+    parameter_grid is Dict[parameter name, list of values], e.g. product parameters and agent configuration, and
+    cells are all combinations of the values. Cells are run on a pool of num_of_workers processes, so cell_function
+    and its results should be picklable, i.e. defined at module level.
+    Each result is saved in cache_directory as soon as its cell finishes, keyed by a hash of the cell function,
+    parameters, seed and code version. Rerunning a sweep only computes cells which are new, changed or were
+    interrupted."""
+
+    def __init__(self, cell_function: Callable, cache_directory, num_of_workers=None, code_version=None):
+        self.cell_function = cell_function
+        self.cache_directory = cache_directory
+        self.num_of_workers = num_of_workers or os.cpu_count()
+        if code_version is None:
+            # the simulation source code, and the module defining cell_function if it lives elsewhere
+            cell_function_file = inspect.getsourcefile(cell_function)
+            code_version = source_code_version() if os.path.dirname(cell_function_file) == SOURCE_PATH else \
+                source_code_version() + source_code_version([cell_function_file])
+        self.code_version = code_version
+        os.makedirs(cache_directory, exist_ok=True)
+
+    @staticmethod
+    def expand_grid(parameter_grid: Dict[str, List]):
+        parameter_names = list(parameter_grid)
+        return [dict(zip(parameter_names, values)) for values in
+                itertools.product(*[parameter_grid[name] for name in parameter_names])]
+
+    def cache_key(self, parameters: Dict, seed):
+        key = json.dumps({'cell_function': f'{self.cell_function.__module__}.{self.cell_function.__qualname__}',
+                          'parameters': parameters, 'seed': seed, 'code_version': self.code_version},
+                         sort_keys=True, default=repr)
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _cache_path(self, parameters: Dict, seed):
+        return os.path.join(self.cache_directory, f'{self.cache_key(parameters, seed)}.pkl')
+
+    def _load_cached_result(self, parameters: Dict, seed):
+        cache_path = self._cache_path(parameters, seed)
+        if not os.path.exists(cache_path):
+            return None
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+
+    def _save_result(self, cell: ExperimentCell):
+        # written to a temporary file first, so an interrupted sweep never leaves a partial cache entry
+        cache_path = self._cache_path(cell.parameters, cell.seed)
+        with open(cache_path + '.tmp', 'wb') as f:
+            pickle.dump({'parameters': cell.parameters, 'seed': cell.seed, 'result': cell.result}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(cache_path + '.tmp', cache_path)
+
+    def run(self, parameter_grid: Dict[str, List], seeds=(0,), print_log=False) -> List[ExperimentCell]:
+        """Returns ExperimentCells in grid order, seeds varying fastest"""
+        cells = []
+        for parameters in self.expand_grid(parameter_grid):
+            for seed in seeds:
+                cached_result = self._load_cached_result(parameters, seed)
+                cells.append(ExperimentCell(parameters, seed) if cached_result is None else
+                             ExperimentCell(parameters, seed, cached_result['result'], is_cached=True))
+        pending_cells = [cell for cell in cells if not cell.is_cached]
+        if print_log:
+            print(f'{len(cells) - len(pending_cells)} of {len(cells)} cells are cached, '
+                  f'running {len(pending_cells)} cells')
+
+        if self.num_of_workers == 1 or len(pending_cells) <= 1:
+            for cell in pending_cells:
+                cell.result = _run_cell(self.cell_function, cell.parameters, cell.seed)
+                self._save_result(cell)
+        elif pending_cells:
+            with ProcessPoolExecutor(max_workers=min(self.num_of_workers, len(pending_cells))) as executor:
+                future_to_cell = {executor.submit(_run_cell, self.cell_function, cell.parameters, cell.seed): cell
+                                  for cell in pending_cells}
+                for future in as_completed(future_to_cell):
+                    cell = future_to_cell[future]
+                    cell.result = future.result()
+                    self._save_result(cell)
+                    if print_log:
+                        print(f'finished {cell.parameters}, seed {cell.seed}')
+        return cells
+
+    def clear_cache(self):
+        for file_name in os.listdir(self.cache_directory):
+            if file_name.endswith('.pkl'):
+                os.remove(os.path.join(self.cache_directory, file_name))
+
+
+def simulate_delta_hedge_pnl(strike, hedging_method, num_of_trails=3000, simulation_time=10, expiry=10,
+                             option_type='call', initial_value=100, mu=-0.02 / 252, sigma=0.2 / np.sqrt(252),
+                             option_unit=10):
+    """The delta hedging experiment of HowDoesHedgingFrequencyInfluencePNL.ipynb as a cell function.
+    hedging_method is 'daily_delta_hedging', 'initial_delta_hedging' or 'no_delta_hedging', option_type is 'call' or
+    'put'.
+    Returns the cumulative PnL of each trail"""
+    if hedging_method not in HEDGING_METHODS:
+        raise Exception(f'hedging_method should be one of {HEDGING_METHODS}')
+    if option_type not in OPTION_TYPES:
+        raise Exception(f'option_type should be one of {OPTION_TYPES}')
+    stock = StockGeometricBrownianMotion('stock_gbm', initial_value, mu, sigma)
+    option_class = EuropeanCallOption if option_type == 'call' else EuropeanPutOption
+    market_input = Market([stock, option_class('option', [stock], strike, expiry)])
+    delta_hedging_initial_asset = {'Cash': 10000, 'stock_gbm': 0, 'option': option_unit}
+
+    final_pnl_list = []
+    for _ in range(int(num_of_trails)):
+        delta_hedging_trader = DeltaHedger('Agent', copy.deepcopy(delta_hedging_initial_asset))
+        market = copy.deepcopy(market_input)
+        market.mark_current_value_to_record(0)
+        if hedging_method in ['daily_delta_hedging', 'initial_delta_hedging']:
+            delta_hedging_trader.generate_delta_hedging_plans(market)
+            delta_hedging_trader.trade(market, 0)
+        delta_hedging_trader.mark_holding_values(market, 0)
+        for time in range(1, simulation_time + 1):
+            market.evolve(time)
+            market.mark_current_value_to_record(time)
+            delta_hedging_trader.mark_holding_values(market, time)
+            if hedging_method in ['daily_delta_hedging']:
+                delta_hedging_trader.generate_delta_hedging_plans(market)
+                delta_hedging_trader.trade(market, time)
+        final_pnl_list.append(delta_hedging_trader.historical_holding_values[simulation_time] -
+                              delta_hedging_trader.historical_holding_values[0])
+    return final_pnl_list
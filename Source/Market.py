@@ -1,9 +1,24 @@
 from typing import List, Dict
 from collections import OrderedDict
-from scipy.stats import norm
 import copy
+import math
 import numpy as np
-import pandas as pd
+
+
+class StandardNormal(object):
+    """Scalar standard normal cdf and pdf, a drop-in for scipy.stats.norm in option pricing.
+    The core simulation only depends on numpy, so importing it stays fast for short-lived worker processes."""
+
+    @staticmethod
+    def cdf(x):
+        return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+
+    @staticmethod
+    def pdf(x):
+        return math.exp(-0.5 * x * x) / math.sqrt(2 * math.pi)
+
+
+norm = StandardNormal()
 
 
 class FinancialProduct(object):
@@ -21,13 +36,18 @@ class FinancialProduct(object):
     def check_initial_value(self):
         return self.initial_value
 
-    def evolve(self, time=0):
+    def evolve(self, time=0, dt=1):
         """evolve is a method for Financial products to update its price """
+        """dt is the time elapsed since the last evolve in days, mu and sigma are per day"""
         pass
 
     def simulate_price_moves(self, time=0, simulation_horizon=1, num_of_trails=1e3):
         """the price simulation method simulate future prices based on Monte Carlo Simulation"""
         """It can price a financial product in P measure (Real measure, historical measure)"""
+        try:
+            return list(self.simulate_price_paths(time, simulation_horizon, num_of_trails)[:, -1])
+        except NotImplementedError:
+            pass  # products without vectorized dynamics are simulated one realization at a time
         future_price_list = []
         for _ in range(int(num_of_trails)):
             tamp_asset_in_one_realization = copy.deepcopy(self)
@@ -36,6 +56,32 @@ class FinancialProduct(object):
             future_price_list.append(tamp_asset_in_one_realization.current_value)
         return future_price_list
 
+    def simulate_price_paths(self, time=0, simulation_horizon=1, num_of_trails=1e3, random_shocks=None):
+        """Vectorized counterpart of simulate_price_moves. All trails are evolved together as numpy arrays."""
+        """Returns an array of shape (num_of_trails, simulation_horizon + 1), column 0 is the current value.
+        random_shocks are standard normal draws of shape (num_of_trails, simulation_horizon); pass them in to
+        control the randomness, e.g. antithetic variates"""
+        num_of_trails = int(num_of_trails)
+        simulation_horizon = int(simulation_horizon)
+        if random_shocks is None:
+            random_shocks = np.random.standard_normal((num_of_trails, simulation_horizon))
+        paths = np.empty((num_of_trails, simulation_horizon + 1))
+        paths[:, 0] = self.current_value
+        path_state = self._initial_path_state(time, num_of_trails)
+        for step in range(simulation_horizon):
+            paths[:, step + 1] = self._evolve_paths(paths[:, step], time + step + 1, random_shocks[:, step],
+                                                    path_state)
+        return paths
+
+    def _initial_path_state(self, time, num_of_trails, dt=1):
+        # extra per-trail state needed by _evolve_paths, e.g. the trend factor of trending stocks.
+        # dt is the length of the first simulated step, later steps are 1 day
+        return {}
+
+    def _evolve_paths(self, values, time, random_shocks, path_state, dt=1):
+        """the vectorized version of evolve, moves an array of values dt days forward to time"""
+        raise NotImplementedError(f'{type(self).__name__} does not support vectorized price path simulation')
+
     def mark_current_value_to_record(self, time):
         if time in self.price_record:
             raise Exception(f'There has been a price record in time {time}')
@@ -60,6 +106,10 @@ class Market(object):
         else:
             raise Exception('The name to check is NOT in the market')
 
+    def check_execution_price(self, financial_product_name, unit):
+        """the price per unit at which trading unit of a financial product is filled, the market has no price impact"""
+        return self.check_value(financial_product_name)
+
     def check_initial_value(self, financial_product_name):
         if financial_product_name in self._financial_product_dict:
             return self._financial_product_dict[financial_product_name].initial_value
@@ -115,9 +165,15 @@ class Market(object):
         else:
             raise Exception('The name to check record value is NOT in the market')
 
-    def evolve(self, time=0):
+    def evolve(self, time=0, dt=1):
         for financial_product in self._financial_product_dict.values():
-            financial_product.evolve(time)
+            financial_product.evolve(time, dt)
+
+    def evolve_financial_product(self, financial_product_name, time=0, dt=1):
+        if financial_product_name in self._financial_product_dict:
+            self._financial_product_dict[financial_product_name].evolve(time, dt)
+        else:
+            raise Exception('The name to evolve is NOT in the market')
 
     def mark_current_value_to_record(self, time):
         for financial_product in self._financial_product_dict.values():
@@ -131,8 +187,11 @@ class Stock(FinancialProduct):
         self.mu = mu
         self.sigma = sigma
 
-    def evolve(self, time=0):
-        self.current_value += np.random.normal(self.mu, self.sigma)
+    def evolve(self, time=0, dt=1):
+        self.current_value += np.random.normal(self.mu * dt, self.sigma * np.sqrt(dt))
+
+    def _evolve_paths(self, values, time, random_shocks, path_state, dt=1):
+        return values + self.mu * dt + self.sigma * np.sqrt(dt) * random_shocks
 
 
 class StockGeometricBrownianMotion(FinancialProduct):
@@ -143,8 +202,11 @@ class StockGeometricBrownianMotion(FinancialProduct):
         self.mu = mu
         self.sigma = sigma
 
-    def evolve(self, time=0):
-        self.current_value *= np.exp(np.random.normal(self.mu, self.sigma))
+    def evolve(self, time=0, dt=1):
+        self.current_value *= np.exp(np.random.normal(self.mu * dt, self.sigma * np.sqrt(dt)))
+
+    def _evolve_paths(self, values, time, random_shocks, path_state, dt=1):
+        return values * np.exp(self.mu * dt + self.sigma * np.sqrt(dt) * random_shocks)
 
 
 class MockStockGeometricBrownianMotion(FinancialProduct):
@@ -157,13 +219,24 @@ class MockStockGeometricBrownianMotion(FinancialProduct):
         self.sigma = sigma
         self.next_period_value = initial_value * np.exp(np.random.normal(self.mu, self.sigma))
 
-    def evolve(self, time=0):
+    def evolve(self, time=0, dt=1):
+        # the next period is assumed to be as long as the current one
         self.current_value = self.next_period_value
-        self.next_period_value = self.current_value * np.exp(np.random.normal(self.mu, self.sigma))
+        self.next_period_value = self.current_value * np.exp(np.random.normal(self.mu * dt, self.sigma * np.sqrt(dt)))
 
     def observe(self, observation_std):
         return self.next_period_value * np.exp(np.random.normal(0, observation_std))
 
+    def _initial_path_state(self, time, num_of_trails, dt=1):
+        return {'is_first_step': True}
+
+    def _evolve_paths(self, values, time, random_shocks, path_state, dt=1):
+        # the next period value has already been drawn, so the first simulated step is deterministic
+        if path_state['is_first_step']:
+            path_state['is_first_step'] = False
+            return np.full_like(values, self.next_period_value)
+        return values * np.exp(self.mu * dt + self.sigma * np.sqrt(dt) * random_shocks)
+
 
 class StockMeanRevertingGeometricBrownianMotion(FinancialProduct):
     """Stocks with 2 components, Mean reverting component to an equilibrium price and
@@ -176,9 +249,14 @@ class StockMeanRevertingGeometricBrownianMotion(FinancialProduct):
         self.equilibrium_price = equilibrium_price
         self.mean_reversion_speed = mean_reversion_speed
 
-    def evolve(self, time=0):
-        self.current_value *= np.exp(np.random.normal(self.mu + self.mean_reversion_speed *
-                                                      (self.equilibrium_price - self.current_value), self.sigma))
+    def evolve(self, time=0, dt=1):
+        self.current_value *= np.exp(np.random.normal((self.mu + self.mean_reversion_speed *
+                                                       (self.equilibrium_price - self.current_value)) * dt,
+                                                      self.sigma * np.sqrt(dt)))
+
+    def _evolve_paths(self, values, time, random_shocks, path_state, dt=1):
+        return values * np.exp((self.mu + self.mean_reversion_speed * (self.equilibrium_price - values)) * dt +
+                               self.sigma * np.sqrt(dt) * random_shocks)
 
 
 class StockTrendingGeometricBrownianMotion(FinancialProduct):
@@ -194,14 +272,44 @@ class StockTrendingGeometricBrownianMotion(FinancialProduct):
         self.trend_scale_param = trend_scale_param
         self.trend_decay_param = trend_decay_param
 
-    def evolve(self, time=0):
-        df = pd.DataFrame(list(self.price_record.values()), columns=['price'])
-        df['time'] = self.price_record.keys()
-        df['log_ret'] = np.log(df.price) - np.log(df.price.shift(1))
-        df['time_diff'] = time - df['time']
-        df['trend_factor'] = df['log_ret'] * np.exp(-self.trend_decay_param * df['time_diff'])
-        self.current_value *= np.exp(np.random.normal(self.mu + self.trend_scale_param * df['trend_factor'].sum(),
-                                                      self.sigma))
+    def evolve(self, time=0, dt=1):
+        self.current_value *= np.exp(np.random.normal((self.mu + self.trend_scale_param * self.trend_factor(time)) * dt,
+                                                      self.sigma * np.sqrt(dt)))
+
+    def trend_factor(self, time):
+        if len(self.price_record) < 2:
+            return 0
+        record_time = np.fromiter(self.price_record.keys(), dtype=float, count=len(self.price_record))
+        record_price = np.fromiter(self.price_record.values(), dtype=float, count=len(self.price_record))
+        log_ret = np.diff(np.log(record_price))
+        return float(np.sum(log_ret * np.exp(-self.trend_decay_param * (time - record_time[1:]))))
+
+    def simulate_price_moves(self, time=0, simulation_horizon=1, num_of_trails=1e3):
+        # as evolve, simulated values are not recorded, so the trend factor only decays the recorded log returns
+        # and is the same for every trail. simulate_price_paths instead treats simulated values as recorded
+        trend_factors = np.array([self.trend_factor(time_in_simulation) for time_in_simulation in
+                                  range(time + 1, time + int(simulation_horizon) + 1)])
+        log_returns = np.random.normal(self.mu + self.trend_scale_param * trend_factors, self.sigma,
+                                       (int(num_of_trails), int(simulation_horizon)))
+        return list(self.current_value * np.exp(np.sum(log_returns, axis=1)))
+
+    def _initial_path_state(self, time, num_of_trails, dt=1):
+        # the trend factor at the end of the first step, as evolve(time + dt, dt)
+        trend_factor = self.trend_factor(time + dt)
+        if self.price_record and next(reversed(self.price_record)) < time:
+            # the current value is the first simulated value treated as recorded, at time
+            trend_factor += np.exp(-self.trend_decay_param * dt) * \
+                np.log(self.current_value / next(reversed(self.price_record.values())))
+        return {'trend_factor': np.full(num_of_trails, trend_factor)}
+
+    def _evolve_paths(self, values, time, random_shocks, path_state, dt=1):
+        # each simulated value is treated as recorded, so the trend factor is updated recursively, the next step
+        # being 1 day: trend_factor(t + 1) = exp(-trend_decay_param) * (trend_factor(t) + log return at t)
+        new_values = values * np.exp((self.mu + self.trend_scale_param * path_state['trend_factor']) * dt +
+                                     self.sigma * np.sqrt(dt) * random_shocks)
+        path_state['trend_factor'] = np.exp(-self.trend_decay_param) * \
+            (path_state['trend_factor'] + np.log(new_values) - np.log(values))
+        return new_values
 
 
 class Derivative(FinancialProduct):
@@ -213,13 +321,21 @@ class Derivative(FinancialProduct):
         # Derivative's value is determined on its underlyings.
         # it is the child class's duty to update initial value by evolve(0)
 
+    def payoff(self, underlying_paths):
+        """payoff maps simulated underlying price paths, shape (num_of_trails, num_of_steps + 1), to the
+        derivative's value at expiry for each trail. It is what Monte Carlo pricing averages over"""
+        raise NotImplementedError(f'{type(self).__name__} does not define a payoff')
+
 
 class Option(Derivative):
     # Assume there is no interest rate
-    def __init__(self, name, underlyings, strike, expiry):  # underlyings: List[FinancialProducts]
+    def __init__(self, name, underlyings, strike, expiry, volatility_surface=None):
+        # underlyings: List[FinancialProducts]
+        # volatility_surface: VolatilitySurface, if None the volatility is the underlying's sigma
         super().__init__(name, underlyings)
         self.strike = strike
         self.expiry = expiry
+        self.volatility_surface = volatility_surface
         self.delta = 0
         self.gamma = 0
         self.vega = 0
@@ -230,31 +346,39 @@ class Option(Derivative):
         else:
             self.underlying = underlyings[0]
 
+    def check_annual_volatility(self, time):
+        if self.volatility_surface is not None:
+            return self.volatility_surface.check_volatility(self.strike, self.expiry - time)
+        if not hasattr(self.underlying, 'sigma'):
+            raise Exception('underlying should have volatility parameter sigma')
+        # Stock sigma is daily volatility while option pricing uses annualized volatility
+        return self.underlying.sigma * np.sqrt(FinancialProduct.BUSINESS_DAYS_PER_YEAR)
+
 
 class EuropeanCallOption(Option):
-    def __init__(self, name, underlyings, strike, expiry):
-        super().__init__(name, underlyings, strike, expiry)
+    def __init__(self, name, underlyings, strike, expiry, volatility_surface=None):
+        super().__init__(name, underlyings, strike, expiry, volatility_surface)
         self.evolve(0)
         self.initial_value = self.current_value
 
-    def evolve(self, time=0):
+    def payoff(self, underlying_paths):
+        return np.maximum(underlying_paths[:, -1] - self.strike, 0)
+
+    def evolve(self, time=0, dt=1):
         """https://www.investopedia.com/terms/b/blackscholes.asp"""
         """The evolve method prices derivative under the Arbitrage Free Assumption"""
         """In other words, it prices a financial product in Q measure"""
-        if not hasattr(self.underlying, 'sigma'):
-            raise Exception('underlying should have volatility parameter sigma')
-
         time_to_maturity = (self.expiry - time) / FinancialProduct.BUSINESS_DAYS_PER_YEAR
-        annual_volatility = self.underlying.sigma * np.sqrt(FinancialProduct.BUSINESS_DAYS_PER_YEAR)
-        # TODO: A little bit confusing. Stock Sigma is unit in daily vol while option pricing is using annualized vol
+        annual_volatility = self.check_annual_volatility(time)
 
-        if time_to_maturity < 0:
+        if time_to_maturity < 0 and self.expiry_value is not None:
             self.delta = 0
             self.gamma = 0
             self.vega = 0
             self.current_value = self.expiry_value
             return
         elif time_to_maturity < 1e-6:
+            # settled at the first evolve at or after expiry, as updates may step over it, e.g. every 0.3 day
             self.delta = 0
             self.gamma = 0
             self.vega = 0
@@ -275,25 +399,26 @@ class EuropeanCallOption(Option):
 
 
 class EuropeanPutOption(Option):
-    def __init__(self, name, underlyings, strike, expiry):
-        super().__init__(name, underlyings, strike, expiry)
+    def __init__(self, name, underlyings, strike, expiry, volatility_surface=None):
+        super().__init__(name, underlyings, strike, expiry, volatility_surface)
         self.evolve(0)
         self.initial_value = self.current_value
 
-    def evolve(self, time=0):
-        if not hasattr(self.underlying, 'sigma'):
-            raise Exception('underlying should have volatility parameter sigma')
+    def payoff(self, underlying_paths):
+        return np.maximum(self.strike - underlying_paths[:, -1], 0)
 
+    def evolve(self, time=0, dt=1):
         time_to_maturity = (self.expiry - time) / FinancialProduct.BUSINESS_DAYS_PER_YEAR
-        annual_volatility = self.underlying.sigma * np.sqrt(FinancialProduct.BUSINESS_DAYS_PER_YEAR)
+        annual_volatility = self.check_annual_volatility(time)
 
-        if time_to_maturity < 0:
+        if time_to_maturity < 0 and self.expiry_value is not None:
             self.delta = 0
             self.gamma = 0
             self.vega = 0
             self.current_value = self.expiry_value
             return
         elif time_to_maturity < 1e-6:
+            # settled at the first evolve at or after expiry, as updates may step over it, e.g. every 0.3 day
             self.delta = 0
             self.gamma = 0
             self.vega = 0
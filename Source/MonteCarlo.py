@@ -0,0 +1,119 @@
+import numpy as np
+
+from Source.Market import Derivative, EuropeanCallOption, StockGeometricBrownianMotion
+
+
+class MonteCarloResult(object):
+    def __init__(self, estimate, stderr, num_of_trails):
+        self.estimate = estimate
+        self.stderr = stderr  # standard error of the estimate
+        self.num_of_trails = num_of_trails  # number of simulated price paths
+
+    def confidence_interval(self, num_of_std=1.96):
+        return self.estimate - num_of_std * self.stderr, self.estimate + num_of_std * self.stderr
+
+
+class MonteCarloPricer(object):
+    """MonteCarloPricer values a Derivative by averaging its payoff over simulated paths of its underlying.
+    Paths come from the underlying's simulate_price_paths, so it prices in P measure like simulate_price_moves.
+
+    Variance reduction:
+    antithetic: every path driven by shocks z is paired with a path driven by -z
+    control_variate: a European call on the same underlying is used as control. Its expectation is known in closed
+        form (EuropeanCallOption), which requires a StockGeometricBrownianMotion underlying
+    target_stderr: simulate in batches, stop as soon as the standard error is below target_stderr
+    """
+
+    def __init__(self, antithetic=False, control_variate=False, target_stderr=None, batch_size=10000,
+                 max_num_of_trails=1e6):
+        self.antithetic = antithetic
+        self.control_variate = control_variate
+        self.target_stderr = target_stderr
+        self.batch_size = int(batch_size)
+        self.max_num_of_trails = int(max_num_of_trails)
+        if self.antithetic:
+            if self.batch_size % 2 != 0:
+                raise Exception('batch_size should be even when using antithetic variates')
+            if self.max_num_of_trails < 2:
+                raise Exception('max_num_of_trails should be at least 2 when using antithetic variates')
+            # paths come in pairs, so an odd budget is rounded down and the last batch is never empty
+            self.max_num_of_trails -= self.max_num_of_trails % 2
+
+    def price(self, derivative: Derivative, time=0):
+        if len(derivative.underlyings) != 1:
+            raise Exception('MonteCarloPricer supports derivatives with exactly one underlying')
+        underlying = derivative.underlyings[0]
+        simulation_horizon = int(derivative.expiry - time)
+        if simulation_horizon <= 0:
+            raise Exception('The derivative has already expired')
+
+        control_strike, control_expectation = None, None
+        if self.control_variate:
+            control_strike = getattr(derivative, 'strike', underlying.current_value)
+            control_expectation = self._european_call_expectation(underlying, control_strike, simulation_horizon)
+
+        # running sums over samples, one sample is one path (or one antithetic pair of paths)
+        num_of_samples, num_of_trails = 0, 0
+        sum_payoff, sum_payoff_sq, sum_control, sum_control_sq, sum_cross = 0., 0., 0., 0., 0.
+        estimate, stderr = 0., np.inf
+
+        while num_of_trails < self.max_num_of_trails:
+            batch_size = min(self.batch_size, self.max_num_of_trails - num_of_trails)
+            if self.antithetic:
+                half_shocks = np.random.standard_normal((batch_size // 2, simulation_horizon))
+                random_shocks = np.concatenate([half_shocks, -half_shocks])
+            else:
+                random_shocks = np.random.standard_normal((batch_size, simulation_horizon))
+            paths = underlying.simulate_price_paths(time, simulation_horizon, len(random_shocks), random_shocks)
+            num_of_trails += len(random_shocks)
+
+            payoff = derivative.payoff(paths)
+            control = np.maximum(paths[:, -1] - control_strike, 0) if self.control_variate else np.zeros(len(paths))
+            if self.antithetic:
+                payoff = 0.5 * (payoff[:len(payoff) // 2] + payoff[len(payoff) // 2:])
+                control = 0.5 * (control[:len(control) // 2] + control[len(control) // 2:])
+
+            num_of_samples += len(payoff)
+            sum_payoff += payoff.sum()
+            sum_payoff_sq += np.dot(payoff, payoff)
+            sum_control += control.sum()
+            sum_control_sq += np.dot(control, control)
+            sum_cross += np.dot(payoff, control)
+
+            estimate, stderr = self._estimate(num_of_samples, sum_payoff, sum_payoff_sq, sum_control, sum_control_sq,
+                                              sum_cross, control_expectation)
+            if self.target_stderr is not None and stderr <= self.target_stderr:
+                break
+
+        return MonteCarloResult(estimate, stderr, num_of_trails)
+
+    @staticmethod
+    def _estimate(num_of_samples, sum_payoff, sum_payoff_sq, sum_control, sum_control_sq, sum_cross,
+                  control_expectation):
+        mean_payoff = sum_payoff / num_of_samples
+        if num_of_samples < 2:
+            return mean_payoff, np.inf
+        var_payoff = (sum_payoff_sq - num_of_samples * mean_payoff ** 2) / (num_of_samples - 1)
+        if control_expectation is None:
+            return mean_payoff, np.sqrt(max(var_payoff, 0) / num_of_samples)
+
+        mean_control = sum_control / num_of_samples
+        var_control = (sum_control_sq - num_of_samples * mean_control ** 2) / (num_of_samples - 1)
+        cov = (sum_cross - num_of_samples * mean_payoff * mean_control) / (num_of_samples - 1)
+        if var_control <= 0:
+            return mean_payoff, np.sqrt(max(var_payoff, 0) / num_of_samples)
+        beta = cov / var_control
+        residual_var = var_payoff - cov ** 2 / var_control
+        return mean_payoff - beta * (mean_control - control_expectation), \
+            np.sqrt(max(residual_var, 0) / num_of_samples)
+
+    @staticmethod
+    def _european_call_expectation(underlying, strike, simulation_horizon):
+        """Expected European call payoff under the underlying's own GBM dynamics. EuropeanCallOption prices with a
+        driftless underlying, so it is evaluated on the forward price S * exp((mu + sigma^2 / 2) * horizon)"""
+        if type(underlying) is not StockGeometricBrownianMotion:
+            raise Exception('control variate requires a StockGeometricBrownianMotion underlying')
+        forward_price = underlying.current_value * \
+            np.exp((underlying.mu + 0.5 * underlying.sigma ** 2) * simulation_horizon)
+        forward_underlying = StockGeometricBrownianMotion(underlying.name, forward_price, 0, underlying.sigma)
+        return EuropeanCallOption('control_variate', [forward_underlying], strike, simulation_horizon).current_value
@@ -0,0 +1,204 @@
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Dict, List
+
+import numpy as np
+
+from Source import Market
+from Source.Agent import Agent
+
+
+class PopulationTradingHistoryRecord(object):
+    def __init__(self, time, asset_names, units):
+        self.time = time
+        self.asset_names = asset_names
+        self.units = units  # np.array of shape (num_of_agents, num_of_assets), executed units, 0 if not traded
+
+
+class Population(object):
+    """Population holds N agents in arrays instead of N Agent objects.
+    Cash is an array of shape (N,), positions and trading intentions are arrays of shape (N, num_of_assets), with
+    assets ordered as in asset_names. decision_making, trade and evaluation run for all agents at once, and
+    agent(index) gives an Agent view of a single agent on demand."""
+
+    def __init__(self, names: List[str], initial_asset: Dict[str, float]):
+        # initial_asset values are either one number shared by all agents, or one number per agent
+        if 'Cash' not in initial_asset:
+            raise Exception('Cash is required in the initialization')
+        if len(set(names)) < len(names):
+            raise Exception('Multiple agents have same name')
+        self._names = list(names)
+        self._index = {name: i for i, name in enumerate(self._names)}
+        self.asset_names = [asset_name for asset_name in initial_asset if asset_name != 'Cash']
+        self._asset_index = {asset_name: i for i, asset_name in enumerate(self.asset_names)}
+
+        num_of_agents = len(self._names)
+        self._cash = np.array(np.broadcast_to(initial_asset['Cash'], (num_of_agents,)), dtype=float)
+        self._position = np.zeros((num_of_agents, len(self.asset_names)))
+        for asset_name, asset_units in initial_asset.items():
+            if asset_name != 'Cash':
+                self._position[:, self._asset_index[asset_name]] = asset_units
+        self._initial_cash = self._cash.copy()
+        self._initial_position = self._position.copy()
+
+        self._trading_intention = np.zeros_like(self._position)
+        # _trading_intention > 0 means we want to buy, < 0 means we want to sell
+
+        self._trading_history = []  # List[PopulationTradingHistoryRecord]
+        self.historical_holding_values = OrderedDict()  # Dict[time, np.array of shape (N,)]
+        self._holding_asset_value = np.zeros(num_of_agents)
+
+    def __len__(self):
+        return len(self._names)
+
+    def agent(self, agent_name_or_index):
+        index = self._index[agent_name_or_index] if isinstance(agent_name_or_index, str) else agent_name_or_index
+        return PopulationAgentView(self, index)
+
+    def decision_making(self):
+        # decision_making fills self._trading_intention for all agents at once
+        pass
+
+    def _check_prices(self, market: Market):
+        return np.array([market.check_value(asset_name) for asset_name in self.asset_names], dtype=float)
+
+    def trade(self, market: Market, time):
+        """Same rules as Agent.trade for every agent: assets are traded in order, a trade is cancelled if the agent's
+        Cash is not enough at that moment"""
+        # all agents' orders of an asset are filled together at one price
+        current_prices = [market.check_execution_price(asset_name, self._trading_intention[:, asset_i].sum())
+                          for asset_i, asset_name in enumerate(self.asset_names)]
+        executed_units = np.zeros_like(self._trading_intention)
+        for asset_i in range(len(self.asset_names)):
+            asset_trading_unit = self._trading_intention[:, asset_i]
+            trading_cost = current_prices[asset_i] * asset_trading_unit
+            is_executed = (self._cash >= trading_cost) & (asset_trading_unit != 0)
+            self._cash -= np.where(is_executed, trading_cost, 0)
+            executed_units[:, asset_i] = np.where(is_executed, asset_trading_unit, 0)
+        self._position += executed_units
+        self._trading_history.append(PopulationTradingHistoryRecord(time, self.asset_names, executed_units))
+        self._trading_intention[:] = 0
+
+    def evaluate_holding_asset_values(self, market: Market):
+        self._holding_asset_value = self._cash + self._position @ self._check_prices(market)
+        return self._holding_asset_value
+
+    def mark_holding_values(self, market: Market, time):
+        self.historical_holding_values[time] = self.evaluate_holding_asset_values(market).copy()
+
+    def calculate_init_asset_value(self, market: Market):
+        initial_prices = np.array([market.check_initial_value(asset_name) for asset_name in self.asset_names],
+                                  dtype=float)
+        return self._initial_cash + self._initial_position @ initial_prices
+
+    def _historical_returns(self):
+        # np.array of shape (num_of_times - 1, N), same as pd.Series.pct_change for each agent
+        historical_holding_values = np.array(list(self.historical_holding_values.values()))
+        return historical_holding_values[1:] / historical_holding_values[:-1] - 1
+
+    def calculate_average_return(self):
+        return self._historical_returns().mean(axis=0)
+
+    def calculate_std_return(self):
+        return self._historical_returns().std(axis=0, ddof=1)
+
+    def calculate_sharpe_ratio(self):
+        return self.calculate_average_return() / self.calculate_std_return()
+
+    def calculate_max_drawdown(self):
+        historical_holding_values = np.array(list(self.historical_holding_values.values()))
+        return (np.maximum.accumulate(historical_holding_values, axis=0) - historical_holding_values).max(axis=0)
+
+    def calculate_hit_rate(self):
+        if len(self.historical_holding_values) == 1:
+            return np.ones(len(self))
+        return (self._historical_returns() >= 0).sum(axis=0) / (len(self.historical_holding_values) - 1)
+
+
+class RandomAIPopulation(Population):
+    # RandomAIPopulation behaves like a population of RandomAITrader
+    def decision_making(self):
+        # for each owned asset: 1/3 buy half, 1/3 sell half, 1/3 hold
+        random_int = np.random.randint(1, 4, size=self._position.shape)
+        trade_num = np.maximum((self._position * 0.5).astype(int), 1)
+        self._trading_intention = np.select([random_int == 1, random_int == 2], [trade_num, -trade_num], 0)\
+            .astype(float)
+
+
+class _PopulationRow(MutableMapping):
+    """Dict-like access to one agent's row of a population array, Dict[asset_name, num_of_units]"""
+
+    def __init__(self, population: Population, index, array_name, with_cash):
+        self._population = population
+        self._index = index
+        self._array_name = array_name
+        self._with_cash = with_cash
+
+    def _row(self):
+        return getattr(self._population, self._array_name)[self._index]
+
+    def __getitem__(self, asset_name):
+        if self._with_cash and asset_name == 'Cash':
+            return float(self._population._cash[self._index])
+        return float(self._row()[self._population._asset_index[asset_name]])
+
+    def __setitem__(self, asset_name, units):
+        if self._with_cash and asset_name == 'Cash':
+            self._population._cash[self._index] = units
+        elif asset_name in self._population._asset_index:
+            self._row()[self._population._asset_index[asset_name]] = units
+        else:
+            raise Exception(f'{asset_name} is NOT an asset of the population')
+
+    def __delitem__(self, asset_name):
+        self[asset_name] = 0
+
+    def __iter__(self):
+        if self._with_cash:
+            yield 'Cash'
+            yield from self._population.asset_names
+        else:
+            # trading intentions only list the assets to be traded
+            row = self._row()
+            yield from (asset_name for asset_name, units in zip(self._population.asset_names, row) if units != 0)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class PopulationAgentView(Agent):
+    """An Agent backed by one row of a Population. Holding assets and trading intention read and write the
+    population arrays, so Agent methods like trade act on the population directly.
+    Histories are copied from the population when the view is created."""
+
+    def __init__(self, population: Population, index):
+        self._population = population
+        self._population_index = index
+        trading_intention = population._trading_intention[index].copy()  # Agent.__init__ resets the intention
+        super().__init__(population._names[index], dict(_PopulationRow(population, index, '_position', True)))
+        population._trading_intention[index] = trading_intention
+        self._initial_asset = {'Cash': float(population._initial_cash[index]),
+                               **dict(zip(population.asset_names, population._initial_position[index]))}
+        self.historical_holding_values = OrderedDict(
+            (time, float(values[index])) for time, values in population.historical_holding_values.items())
+
+    @property
+    def _asset(self):
+        return _PopulationRow(self._population, self._population_index, '_position', True)
+
+    @_asset.setter
+    def _asset(self, asset: Dict[str, float]):
+        row = self._asset
+        for asset_name, units in asset.items():
+            row[asset_name] = units
+
+    @property
+    def _trading_intention(self):
+        return _PopulationRow(self._population, self._population_index, '_trading_intention', False)
+
+    @_trading_intention.setter
+    def _trading_intention(self, trading_intention: Dict[str, float]):
+        self._population._trading_intention[self._population_index] = 0
+        row = self._trading_intention
+        for asset_name, units in trading_intention.items():
+            row[asset_name] = units
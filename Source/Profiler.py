@@ -0,0 +1,150 @@
+import functools
+import json
+import time
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+from Source.Agent import Agent
+from Source.Market import Market, FinancialProduct
+
+
+class PhaseStatistics(object):
+    # duration histogram bins, log spaced from 1 microsecond to 10 seconds
+    HISTOGRAM_BIN_EDGES = np.logspace(-6, 1, 29)
+
+    def __init__(self):
+        self.num_of_calls = 0
+        self.total_seconds = 0.
+        self.max_seconds = 0.
+        self.histogram = np.zeros(len(PhaseStatistics.HISTOGRAM_BIN_EDGES) + 1, dtype=int)
+
+    def add(self, seconds):
+        self.num_of_calls += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.histogram[np.searchsorted(PhaseStatistics.HISTOGRAM_BIN_EDGES, seconds)] += 1
+
+    def quantile(self, q):
+        """upper edge of the histogram bin which holds the q quantile of durations"""
+        bin_index = int(np.searchsorted(np.cumsum(self.histogram), q * self.num_of_calls))
+        if bin_index >= len(PhaseStatistics.HISTOGRAM_BIN_EDGES):
+            return self.max_seconds
+        return min(PhaseStatistics.HISTOGRAM_BIN_EDGES[bin_index], self.max_seconds)
+
+
+class SimulationProfiler(object):
+    """SimulationProfiler records where simulation time goes, without changing user code.
+    While enabled, it wraps Market methods, the evolve method of every FinancialProduct class and Agent methods,
+    and records for each call the phase, e.g. 'Market.evolve', 'evolve/EuropeanCallOption', 'ImpactMarket.match' or
+    'Agent.trade', its wall time and the current step (the time of the latest Market.evolve, or
+    Market.evolve_financial_product as called by EventScheduler). Nothing is wrapped while disabled, so it costs
+    nothing then.
+
+    with SimulationProfiler() as profiler:
+        ... run the simulation ...
+    print(profiler.summary_table())
+    profiler.export_chrome_trace('trace.json')  # open in chrome://tracing or https://ui.perfetto.dev
+    """
+    MARKET_METHOD_NAMES = ['evolve', 'evolve_financial_product', 'mark_current_value_to_record', 'match', 'execute']
+    # Market methods which start a step, and the position of their time argument
+    STEP_METHOD_TIME_ARGUMENT_INDEX = {'evolve': 1, 'evolve_financial_product': 2}
+    AGENT_METHOD_NAMES = ['decision_making', 'trade', 'evaluate_holding_asset_values', 'mark_holding_values',
+                          'evaluate_holding_asset_deltas', 'generate_delta_hedging_plans', 'calculate_average_return',
+                          'calculate_std_return', 'calculate_sharpe_ratio', 'calculate_max_drawdown',
+                          'calculate_hit_rate', 'calculate_init_asset_value']
+    _enabled_profiler = None
+
+    def __init__(self, max_num_of_trace_events=1e6):
+        self.max_num_of_trace_events = int(max_num_of_trace_events)
+        self.phase_statistics = defaultdict(PhaseStatistics)  # Dict[phase, PhaseStatistics]
+        self.step_records = OrderedDict()  # Dict[step, Dict[phase, seconds]]
+        self.current_step = None
+        self._trace_events = []  # List[(phase, start seconds, duration seconds)]
+        self._active_phases = set()
+        self._wrapped_methods = []  # List[(cls, method_name, original method)]
+        self._start_time = None
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disable()
+
+    def enable(self):
+        if SimulationProfiler._enabled_profiler is not None:
+            raise Exception('Another SimulationProfiler has been enabled')
+        SimulationProfiler._enabled_profiler = self
+        self._start_time = time.perf_counter() if self._start_time is None else self._start_time
+        for cls in [Market] + self._subclasses(Market):
+            for method_name in SimulationProfiler.MARKET_METHOD_NAMES:
+                self._wrap(cls, method_name, f'{cls.__name__}.{method_name}')
+        for cls in [FinancialProduct] + self._subclasses(FinancialProduct):
+            self._wrap(cls, 'evolve', None)  # per product class phase, evolve/<class name of the instance>
+        for cls in [Agent] + self._subclasses(Agent):
+            for method_name in SimulationProfiler.AGENT_METHOD_NAMES:
+                self._wrap(cls, method_name, f'{cls.__name__}.{method_name}')
+
+    def disable(self):
+        for cls, method_name, original_method in reversed(self._wrapped_methods):
+            setattr(cls, method_name, original_method)
+        self._wrapped_methods = []
+        self._active_phases = set()
+        if SimulationProfiler._enabled_profiler is self:
+            SimulationProfiler._enabled_profiler = None
+
+    @staticmethod
+    def _subclasses(cls):
+        subclasses = []
+        for subclass in cls.__subclasses__():
+            subclasses += [subclass] + SimulationProfiler._subclasses(subclass)
+        return subclasses
+
+    def _wrap(self, cls, method_name, phase):
+        if method_name not in cls.__dict__:
+            return  # inherited methods are wrapped in the class which defines them
+        original_method = cls.__dict__[method_name]
+        profiler = self
+
+        @functools.wraps(original_method)
+        def profiled_method(*args, **kwargs):
+            method_phase = phase if phase is not None else f'evolve/{type(args[0]).__name__}'
+            if method_phase in profiler._active_phases:
+                # e.g. super().evolve, the outer call has been timed
+                return original_method(*args, **kwargs)
+            if method_name in SimulationProfiler.STEP_METHOD_TIME_ARGUMENT_INDEX and isinstance(args[0], Market):
+                time_argument_index = SimulationProfiler.STEP_METHOD_TIME_ARGUMENT_INDEX[method_name]
+                profiler.current_step = args[time_argument_index] if len(args) > time_argument_index else \
+                    kwargs.get('time', 0)
+            profiler._active_phases.add(method_phase)
+            start_time = time.perf_counter()
+            try:
+                return original_method(*args, **kwargs)
+            finally:
+                profiler._record(method_phase, start_time, time.perf_counter() - start_time)
+                profiler._active_phases.discard(method_phase)
+
+        setattr(cls, method_name, profiled_method)
+        self._wrapped_methods.append((cls, method_name, original_method))
+
+    def _record(self, phase, start_time, seconds):
+        self.phase_statistics[phase].add(seconds)
+        step_record = self.step_records.setdefault(self.current_step, defaultdict(float))
+        step_record[phase] += seconds
+        if len(self._trace_events) < self.max_num_of_trace_events:
+            self._trace_events.append((phase, start_time - self._start_time, seconds))
+
+    def summary_table(self):
+        lines = [f'{"phase":<50}{"calls":>10}{"total ms":>12}{"mean us":>12}{"p50 us":>12}{"p99 us":>12}']
+        for phase, statistics in sorted(self.phase_statistics.items(), key=lambda item: -item[1].total_seconds):
+            lines.append(f'{phase:<50}{statistics.num_of_calls:>10}{statistics.total_seconds * 1e3:>12.3f}'
+                         f'{statistics.total_seconds / statistics.num_of_calls * 1e6:>12.1f}'
+                         f'{statistics.quantile(0.5) * 1e6:>12.1f}{statistics.quantile(0.99) * 1e6:>12.1f}')
+        return '\n'.join(lines)
+
+    def export_chrome_trace(self, file_path):
+        trace_events = [{'name': phase, 'cat': phase.split('.')[0].split('/')[0], 'ph': 'X', 'ts': start * 1e6,
+                         'dur': seconds * 1e6, 'pid': 0, 'tid': 0} for phase, start, seconds in self._trace_events]
+        with open(file_path, 'w') as f:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
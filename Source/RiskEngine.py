@@ -0,0 +1,198 @@
+from typing import Dict
+
+import numpy as np
+
+from Source.Agent import Agent
+from Source.BlackScholes import black_scholes_greeks, black_scholes_price
+from Source.Market import Market, FinancialProduct, Option, EuropeanCallOption, EuropeanPutOption
+
+
+def value_at_risk(pnl, confidence=0.99):
+    """the loss which is exceeded with probability 1 - confidence, reported as a positive number"""
+    return -float(np.quantile(pnl, 1 - confidence))
+
+
+def expected_shortfall(pnl, confidence=0.99):
+    """the average loss of the scenarios at or beyond value_at_risk, reported as a positive number"""
+    pnl = np.asarray(pnl)
+    return -float(np.mean(pnl[pnl <= np.quantile(pnl, 1 - confidence)]))
+
+
+class RiskReport(object):
+    def __init__(self, pnl, base_value):
+        self.pnl = pnl  # np.array of shape (num_of_scenarios,), scenario portfolio value - base_value
+        self.base_value = base_value
+
+    def value_at_risk(self, confidence=0.99):
+        return value_at_risk(self.pnl, confidence)
+
+    def expected_shortfall(self, confidence=0.99):
+        return expected_shortfall(self.pnl, confidence)
+
+    def pnl_histogram(self, num_of_bins=50):
+        return np.histogram(self.pnl, bins=num_of_bins)
+
+
+class SimulatedScenarios(object):
+    """spot multipliers simulated over horizon days, RiskEngine.run and revalue reprice options at that horizon"""
+
+    def __init__(self, spot_multipliers, horizon):
+        self.spot_multipliers = spot_multipliers  # np.array of shape (num_of_scenarios, num_of_underlyings)
+        self.horizon = horizon
+
+
+class RiskEngine(object):
+    """RiskEngine revalues a portfolio of holdings in a market under many scenarios at once.
+    Risk factors are the underlyings: products held directly and the underlyings of held options. A scenario is a
+    relative move of every underlying (spot_multipliers, shape (num_of_scenarios, num_of_underlyings)), optionally an
+    absolute move of the annual volatility of options on every underlying (vol_shifts, same shape), after horizon
+    days. European options are repriced with array Black-Scholes at their own volatility (surface or underlying's
+    sigma) plus the shift, other options are revalued with their delta, and Cash does not move.
+    Positions and contract terms are extracted into arrays once, so each revaluation is a few array operations."""
+
+    def __init__(self, market: Market, holdings: Dict[str, float], time=0):
+        self.time = time
+        self.cash = 0.
+        self.underlying_names = []
+        underlying_index = {}
+
+        def check_underlying_index(financial_product: FinancialProduct):
+            if financial_product.name not in underlying_index:
+                underlying_index[financial_product.name] = len(self.underlying_names)
+                self.underlying_names.append(financial_product.name)
+            return underlying_index[financial_product.name]
+
+        position_index, position_units = [], []
+        option_index, option_units, option_strike, option_expiry, option_is_call, option_volatility = \
+            [], [], [], [], [], []
+        other_option_index, other_option_units, other_option_value, other_option_delta = [], [], [], []
+        for financial_product_name, unit in holdings.items():
+            if financial_product_name == 'Cash':
+                self.cash += unit
+                continue
+            financial_product = market._financial_product_dict[financial_product_name]
+            if type(financial_product) in [EuropeanCallOption, EuropeanPutOption] and time <= financial_product.expiry:
+                option_index.append(check_underlying_index(financial_product.underlying))
+                option_units.append(unit)
+                option_strike.append(financial_product.strike)
+                option_expiry.append(financial_product.expiry)
+                option_is_call.append(type(financial_product) is EuropeanCallOption)
+                option_volatility.append(financial_product.check_annual_volatility(time))
+            elif isinstance(financial_product, Option):
+                # path dependent or expired options, first order in the underlying's move
+                other_option_index.append(check_underlying_index(financial_product.underlying))
+                other_option_units.append(unit)
+                other_option_value.append(financial_product.current_value)
+                other_option_delta.append(financial_product.delta)
+            else:
+                position_index.append(check_underlying_index(financial_product))
+                position_units.append(unit)
+
+        self.underlying_values = np.array([market.check_value(name) for name in self.underlying_names], dtype=float)
+        self._position_index = np.array(position_index, dtype=int)
+        self._position_units = np.array(position_units, dtype=float)
+        self._option_index = np.array(option_index, dtype=int)
+        self._option_units = np.array(option_units, dtype=float)
+        self._option_strike = np.array(option_strike, dtype=float)
+        self._option_expiry = np.array(option_expiry, dtype=float)
+        self._option_is_call = np.array(option_is_call, dtype=bool)
+        self._option_volatility = np.array(option_volatility, dtype=float)
+        self._other_option_index = np.array(other_option_index, dtype=int)
+        self._other_option_units = np.array(other_option_units, dtype=float)
+        self._other_option_value = np.array(other_option_value, dtype=float)
+        self._other_option_delta = np.array(other_option_delta, dtype=float)
+        self.base_value = float(self.revalue(np.ones((1, len(self.underlying_names))))[0])
+
+    @classmethod
+    def from_agent(cls, market: Market, agent: Agent, time=0):
+        return cls(market, agent._asset, time)
+
+    @property
+    def num_of_underlyings(self):
+        return len(self.underlying_names)
+
+    def _option_time_to_maturity(self, horizon):
+        return np.maximum(self._option_expiry - self.time - horizon, 0) / FinancialProduct.BUSINESS_DAYS_PER_YEAR
+
+    def revalue(self, spot_multipliers, vol_shifts=None, horizon=None):
+        """Returns the portfolio value in each scenario, shape (num_of_scenarios,).
+        spot_multipliers is an array, or SimulatedScenarios which also give the horizon. horizon is 0 by default"""
+        if isinstance(spot_multipliers, SimulatedScenarios):
+            if horizon is not None and horizon != spot_multipliers.horizon:
+                raise Exception(f'The scenarios are simulated over {spot_multipliers.horizon} days, not {horizon}')
+            spot_multipliers, horizon = spot_multipliers.spot_multipliers, spot_multipliers.horizon
+        horizon = 0 if horizon is None else horizon
+        spot_multipliers = np.asarray(spot_multipliers, dtype=float)
+        spots = self.underlying_values * spot_multipliers  # (num_of_scenarios, num_of_underlyings)
+        values = self.cash + spots[:, self._position_index] @ self._position_units
+        if len(self._option_index):
+            option_volatility = self._option_volatility if vol_shifts is None else \
+                np.maximum(self._option_volatility + np.asarray(vol_shifts, dtype=float)[:, self._option_index], 0)
+            option_values = black_scholes_price(spots[:, self._option_index], self._option_strike,
+                                                self._option_time_to_maturity(horizon), option_volatility,
+                                                self._option_is_call)
+            values = values + option_values @ self._option_units
+        if len(self._other_option_index):
+            spot_moves = spots[:, self._other_option_index] - self.underlying_values[self._other_option_index]
+            values = values + (self._other_option_value + self._other_option_delta * spot_moves) @ \
+                self._other_option_units
+        return values
+
+    def run(self, spot_multipliers, vol_shifts=None, horizon=None):
+        return RiskReport(self.revalue(spot_multipliers, vol_shifts, horizon) - self.base_value, self.base_value)
+
+    def grid_scenarios(self, spot_bumps, vol_bumps=(0,)):
+        """Every combination of a relative spot bump and an absolute annual volatility bump, applied to all
+        underlyings together. Returns spot_multipliers and vol_shifts, shape (len(spot_bumps) * len(vol_bumps),
+        num_of_underlyings)"""
+        spot_bump_grid, vol_bump_grid = np.meshgrid(np.asarray(spot_bumps, dtype=float),
+                                                    np.asarray(vol_bumps, dtype=float), indexing='ij')
+        shape = (spot_bump_grid.size, self.num_of_underlyings)
+        return np.broadcast_to(1 + spot_bump_grid.reshape(-1, 1), shape).copy(), \
+            np.broadcast_to(vol_bump_grid.reshape(-1, 1), shape).copy()
+
+    def simulated_scenarios(self, market: Market, horizon=1, num_of_scenarios=1e4) -> SimulatedScenarios:
+        """Spot multipliers of the underlyings after horizon days, simulated by their own dynamics with
+        simulate_price_moves, independently across underlyings. They are returned with the horizon, so options are
+        repriced horizon days later"""
+        spot_multipliers = np.empty((int(num_of_scenarios), self.num_of_underlyings))
+        for i, underlying_name in enumerate(self.underlying_names):
+            financial_product = market._financial_product_dict[underlying_name]
+            spot_multipliers[:, i] = np.asarray(financial_product.simulate_price_moves(
+                self.time, horizon, num_of_scenarios)) / self.underlying_values[i]
+        return SimulatedScenarios(spot_multipliers, horizon)
+
+    def greek_ladder(self, spot_bumps, horizon=0):
+        """Portfolio delta, gamma and vega per underlying, with the underlying bumped by each relative spot bump and
+        the other underlyings unchanged. Returns Dict[greek name, np.array of shape (num_of_underlyings,
+        len(spot_bumps))]. Units are the same as Option.delta, Option.gamma and Option.vega, and directly held
+        products count as delta 1 per unit"""
+        spot_multipliers = 1 + np.asarray(spot_bumps, dtype=float)
+        ladder = {greek_name: np.zeros((self.num_of_underlyings, len(spot_multipliers)))
+                  for greek_name in ['delta', 'gamma', 'vega']}
+        np.add.at(ladder['delta'], self._position_index, self._position_units[:, np.newaxis])
+        np.add.at(ladder['delta'], self._other_option_index,
+                  (self._other_option_units * self._other_option_delta)[:, np.newaxis])
+        if len(self._option_index):
+            # (num_of_options, len(spot_bumps))
+            delta, gamma, vega = black_scholes_greeks(
+                (self.underlying_values[self._option_index][:, np.newaxis] * spot_multipliers),
+                self._option_strike[:, np.newaxis], self._option_time_to_maturity(horizon)[:, np.newaxis],
+                self._option_volatility[:, np.newaxis], self._option_is_call[:, np.newaxis])
+            for greek_name, greek in zip(['delta', 'gamma', 'vega'], [delta, gamma, vega]):
+                np.add.at(ladder[greek_name], self._option_index, self._option_units[:, np.newaxis] * greek)
+        return ladder
+
+    def vega_buckets(self, expiry_bucket_edges):
+        """Portfolio vega per underlying and bucket of days to expiry, bucket i holds days to expiry in
+        [edges[i], edges[i + 1]). Returns np.array of shape (num_of_underlyings, len(expiry_bucket_edges) - 1)"""
+        buckets = np.zeros((self.num_of_underlyings, len(expiry_bucket_edges) - 1))
+        if len(self._option_index):
+            _, _, vega = black_scholes_greeks(self.underlying_values[self._option_index], self._option_strike,
+                                              self._option_time_to_maturity(0), self._option_volatility,
+                                              self._option_is_call)
+            bucket_index = np.searchsorted(expiry_bucket_edges, self._option_expiry - self.time, side='right') - 1
+            is_in_bucket = (bucket_index >= 0) & (bucket_index < buckets.shape[1])
+            np.add.at(buckets, (self._option_index[is_in_bucket], bucket_index[is_in_bucket]),
+                      (self._option_units * vega)[is_in_bucket])
+        return buckets
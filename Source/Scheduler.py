@@ -0,0 +1,75 @@
+import heapq
+from typing import Callable
+
+from Source.Market import Market
+
+
+class ScheduledEvent(object):
+    PRODUCT_UPDATE = 0  # products due at a time are evolved before agents wake up at that time
+    AGENT_WAKEUP = 1
+
+    def __init__(self, event_type, interval, first_time, financial_product_name=None, callback=None):
+        self.event_type = event_type
+        self.interval = interval
+        self.first_time = first_time
+        self.num_of_occurrences = 0
+        self.financial_product_name = financial_product_name
+        self.callback = callback
+
+    def next_time(self):
+        # computed from the first time, so repeated fractional intervals do not accumulate rounding errors
+        return self.first_time + self.num_of_occurrences * self.interval
+
+
+class EventScheduler(object):
+    """EventScheduler is an event driven clock for a Market.
+    Each financial product is evolved every update_interval days, e.g. 1 for daily, 1 / 78 for 5 minute bars in a
+    6.5 hour trading day, and is evolved with dt equal to the time since its last evolve, so mu and sigma (per day)
+    are scaled to the actual step. Agents wake up every wakeup_interval days and act through a callback.
+    A priority queue holds the next event of each product and agent, so products are only evolved when due."""
+    TIME_TOLERANCE = 1e-9  # events within this tolerance of end_time are due, e.g. 30 * 0.1 is not exactly 3
+
+    def __init__(self, market: Market, start_time=0):
+        self.market = market
+        self.current_time = start_time
+        self.num_of_evolve_calls = 0
+        self._event_queue = []  # heap of (time, event_type, sequence_number, ScheduledEvent)
+        self._num_of_events = 0
+        self._last_evolve_time = {}  # Dict[financial_product_name, time]
+
+    def _push(self, event: ScheduledEvent):
+        heapq.heappush(self._event_queue, (event.next_time(), event.event_type, self._num_of_events, event))
+        self._num_of_events += 1
+
+    def schedule_financial_product(self, financial_product_name, update_interval, first_update_time=None):
+        if update_interval <= 0:
+            raise Exception('update_interval should be positive')
+        self.market.check_value(financial_product_name)  # raise if the name is NOT in the market
+        first_update_time = self.current_time + update_interval if first_update_time is None else first_update_time
+        self._last_evolve_time[financial_product_name] = self.current_time
+        self._push(ScheduledEvent(ScheduledEvent.PRODUCT_UPDATE, update_interval, first_update_time,
+                                  financial_product_name=financial_product_name))
+
+    def schedule_agent(self, callback: Callable, wakeup_interval, first_wakeup_time=None):
+        # callback(market, time) is called at each wakeup, e.g. to make decisions and trade
+        if wakeup_interval <= 0:
+            raise Exception('wakeup_interval should be positive')
+        first_wakeup_time = self.current_time + wakeup_interval if first_wakeup_time is None else first_wakeup_time
+        self._push(ScheduledEvent(ScheduledEvent.AGENT_WAKEUP, wakeup_interval, first_wakeup_time,
+                                  callback=callback))
+
+    def run(self, end_time):
+        """process all events up to and including end_time"""
+        while self._event_queue and self._event_queue[0][0] <= end_time + self.TIME_TOLERANCE:
+            time, event_type, _, event = heapq.heappop(self._event_queue)
+            self.current_time = time
+            if event_type == ScheduledEvent.PRODUCT_UPDATE:
+                dt = time - self._last_evolve_time[event.financial_product_name]
+                self.market.evolve_financial_product(event.financial_product_name, time, dt)
+                self._last_evolve_time[event.financial_product_name] = time
+                self.num_of_evolve_calls += 1
+            else:
+                event.callback(self.market, time)
+            event.num_of_occurrences += 1
+            self._push(event)
+        self.current_time = max(self.current_time, end_time)
@@ -0,0 +1,320 @@
+"""A trading session shared by many human and AI clients.
+SessionServer advances a Market on a clock. Every step it evolves the market, broadcasts a snapshot of prices and
+of each client's holdings, collects trading intentions until all clients have answered or the step's deadline has
+passed, and executes them together. Each client is represented on the server by an Agent, so trades follow
+Agent.trade, or ImpactMarket.execute when the market has price impact.
+Clients connect in process (SessionServer.connect) or over a local TCP socket (SessionServer.serve_tcp and
+RemoteSessionClient), with one JSON message per line. Both kinds of client have the same interface:
+    message = await client.next_message()  # {'type': 'snapshot', 'time', 'prices', 'asset', ...} or {'type': 'end'}
+    await client.submit(message['time'], {'stock': 10})
+Run a demo server and join it from a command line window as a human trader:
+    python -m Source.Session serve --port 8765
+    python -m Source.Session join --port 8765 --name alice"""
+import argparse
+import asyncio
+import json
+import math
+import numbers
+import time as timer
+from typing import Callable, Dict
+
+from Source.Agent import Agent
+from Source.Exchange import ImpactMarket
+from Source.Market import Market, StockGeometricBrownianMotion
+
+AGENT_TYPES = ['ai', 'human']
+MESSAGE_QUEUE_SIZE = 16  # a slow client drops its oldest messages, so it always sees the latest snapshot
+
+
+def _is_valid_units(units_of_asset):
+    # units come from clients, only finite real numbers are traded, e.g. not '10', True or -inf
+    return isinstance(units_of_asset, dict) and all(
+        isinstance(unit, numbers.Real) and not isinstance(unit, bool) and math.isfinite(unit)
+        for unit in units_of_asset.values())
+
+
+def _encode_message(message):
+    return (json.dumps(message, default=float) + '\n').encode()
+
+
+class SessionClient(object):
+    """an in process client, messages are passed through an asyncio.Queue"""
+
+    def __init__(self, server, name):
+        self.server = server
+        self.name = name
+        self._message_queue = asyncio.Queue(maxsize=MESSAGE_QUEUE_SIZE)
+
+    def _put_message(self, message):
+        if self._message_queue.full():
+            self._message_queue.get_nowait()
+        self._message_queue.put_nowait(message)
+
+    async def next_message(self):
+        return await self._message_queue.get()
+
+    async def submit(self, time, trading_intention: Dict[str, float]):
+        return self.server.submit_trading_intention(self.name, time, trading_intention)
+
+    async def close(self):
+        self.server.disconnect(self.name)
+
+
+class SessionServer(object):
+    def __init__(self, market: Market, step_interval=0., intention_deadline=1., dt=1, start_time=0):
+        # step_interval: seconds between the starts of two steps, 0 to start the next step as soon as one finishes
+        # intention_deadline: seconds after the snapshot until intentions are executed
+        # dt: days of market time per step
+        self.market = market
+        self.step_interval = step_interval
+        self.intention_deadline = intention_deadline
+        self.dt = dt
+        self.current_time = start_time
+        self.start_time = start_time
+        self._clients = {}  # Dict[name, SessionClient], in connection order
+        self._agents = {}  # Dict[name, Agent]
+        self._agent_types = {}  # Dict[name, 'ai' or 'human']
+        self._submitted_intentions = {}  # Dict[name, trading intention] of the current step
+        self._expected_names = set()  # clients which received the current step's snapshot
+        self._all_submitted = asyncio.Event()
+        self._is_collecting = False
+        self.step_latencies = []  # seconds from broadcasting a snapshot to the end of execution, per step
+
+    def connect(self, name, initial_asset: Dict[str, float], agent_type='ai'):
+        # clients trade through a plain Agent on the server, the client itself is the human or AI interface
+        if name in self._clients:
+            raise Exception(f'A client named {name} has connected')
+        if agent_type not in AGENT_TYPES:
+            raise Exception(f'agent_type should be one of {AGENT_TYPES}')
+        if not _is_valid_units(initial_asset):
+            raise Exception('initial_asset should map asset names to finite numbers')
+        self._agents[name] = Agent(name, initial_asset)
+        self._agent_types[name] = agent_type
+        self._clients[name] = SessionClient(self, name)
+        return self._clients[name]
+
+    def disconnect(self, name):
+        # the agent is kept, so its holdings and history can still be checked
+        self._clients.pop(name, None)
+        self._expected_names.discard(name)
+        self._check_all_submitted()
+
+    def check_agent(self, name) -> Agent:
+        return self._agents[name]
+
+    def check_agent_type(self, name):
+        return self._agent_types[name]
+
+    def submit_trading_intention(self, name, time, trading_intention: Dict[str, float]):
+        """Returns False if the intention is rejected, because it is late, the client has not connected or a unit is
+        not a finite number. Intentions on products which are NOT in the market are dropped"""
+        if not self._is_collecting or time != self.current_time or name not in self._clients or \
+                not _is_valid_units(trading_intention):
+            return False
+        self._submitted_intentions[name] = {
+            asset_name: unit for asset_name, unit in trading_intention.items()
+            if asset_name != 'Cash' and asset_name in self.market._financial_product_dict}
+        self._check_all_submitted()
+        return True
+
+    def _check_all_submitted(self):
+        if self._is_collecting and self._expected_names.issubset(self._submitted_intentions):
+            self._all_submitted.set()
+
+    def _broadcast(self, message_of_client: Callable):
+        for name, client in self._clients.items():
+            client._put_message(message_of_client(name))
+
+    async def step(self):
+        time = self.current_time
+        if time > self.start_time:
+            self.market.evolve(time, self.dt)
+        self.market.mark_current_value_to_record(time)
+        prices = {name: financial_product.current_value
+                  for name, financial_product in self.market._financial_product_dict.items()}
+
+        step_start_time = timer.perf_counter()
+        self._submitted_intentions = {}
+        self._expected_names = set(self._clients)
+        self._all_submitted.clear()
+        self._is_collecting = True
+        for agent in self._agents.values():
+            agent.evaluate_holding_asset_values(self.market)  # holding values at the prices of the snapshot
+        self._broadcast(lambda name: {'type': 'snapshot', 'time': time, 'prices': prices,
+                                      'asset': dict(self._agents[name]._asset),
+                                      'holding_value': self._agents[name]._holding_asset_value,
+                                      'deadline': self.intention_deadline})
+        self._check_all_submitted()
+        try:
+            await asyncio.wait_for(self._all_submitted.wait(), self.intention_deadline)
+        except asyncio.TimeoutError:
+            pass  # clients which have not answered do not trade this step
+        self._is_collecting = False
+
+        agent_list = list(self._agents.values())
+        for name, agent in self._agents.items():
+            agent._trading_intention = self._submitted_intentions.get(name, {})
+            for asset_name in agent._trading_intention:
+                agent._asset.setdefault(asset_name, 0)  # clients may trade products they have not held
+        if isinstance(self.market, ImpactMarket):
+            self.market.execute(agent_list, time)
+        else:
+            for agent in agent_list:
+                agent.trade(self.market, time)
+        for agent in agent_list:
+            agent.mark_holding_values(self.market, time)
+        self.step_latencies.append(timer.perf_counter() - step_start_time)
+
+    async def run(self, num_of_steps):
+        loop = asyncio.get_running_loop()
+        session_start_time = loop.time()
+        for step in range(num_of_steps):
+            await asyncio.sleep(max(session_start_time + step * self.step_interval - loop.time(), 0))
+            await self.step()
+            self.current_time += self.dt
+        self._broadcast(lambda name: {'type': 'end'})
+
+    async def serve_tcp(self, host='127.0.0.1', port=0):
+        """Accept clients on a local socket. The first line from a client is
+        {'type': 'join', 'name', 'initial_asset', 'agent_type': 'ai' or 'human'}, then it sends
+        {'type': 'intention', 'time', 'trading_intention'} lines. Returns the asyncio.Server, whose
+        sockets[0].getsockname() is the address"""
+        return await asyncio.start_server(self._handle_tcp_client, host, port)
+
+    async def _handle_tcp_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = None
+        try:
+            join_message = json.loads(await reader.readline())
+            client = self.connect(join_message['name'], join_message['initial_asset'],
+                                  join_message.get('agent_type', 'ai'))
+        except Exception as exception:
+            writer.write(_encode_message({'type': 'error', 'message': str(exception)}))
+            await writer.drain()
+            writer.close()
+            return
+
+        async def forward_messages():
+            while True:
+                message = await client.next_message()
+                writer.write(_encode_message(message))
+                await writer.drain()
+                if message['type'] == 'end':
+                    break
+
+        forward_task = asyncio.create_task(forward_messages())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if not isinstance(message, dict) or message.get('type') != 'intention':
+                    continue
+                if not self.submit_trading_intention(client.name, message.get('time'),
+                                                     message.get('trading_intention')):
+                    client._put_message({'type': 'error', 'time': message.get('time'),
+                                         'message': 'The intention is rejected, it is late or has invalid units'})
+        except (ConnectionError, ValueError):
+            pass  # a broken client is disconnected, the session goes on
+        finally:
+            forward_task.cancel()
+            self.disconnect(client.name)
+            writer.close()
+
+
+class RemoteSessionClient(object):
+    """a client connected to SessionServer.serve_tcp"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, name):
+        self._reader = reader
+        self._writer = writer
+        self.name = name
+
+    @classmethod
+    async def connect(cls, host, port, name, initial_asset: Dict[str, float], agent_type='ai'):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(_encode_message({'type': 'join', 'name': name, 'initial_asset': initial_asset,
+                                      'agent_type': agent_type}))
+        await writer.drain()
+        return cls(reader, writer, name)
+
+    async def next_message(self):
+        line = await self._reader.readline()
+        return json.loads(line) if line else {'type': 'end'}
+
+    async def submit(self, time, trading_intention: Dict[str, float]):
+        self._writer.write(_encode_message({'type': 'intention', 'time': time,
+                                            'trading_intention': trading_intention}))
+        await self._writer.drain()
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def run_scripted_client(client, strategy: Callable):
+    """Answers every snapshot with strategy(snapshot), a trading intention, until the session ends.
+    Returns the number of snapshots received"""
+    num_of_snapshots = 0
+    while True:
+        message = await client.next_message()
+        if message['type'] == 'error' and 'time' in message:
+            continue  # a rejected intention, the client only holds at that step
+        if message['type'] != 'snapshot':
+            return num_of_snapshots
+        num_of_snapshots += 1
+        await client.submit(message['time'], strategy(message))
+
+
+def _parse_trading_intention(line):
+    # e.g. 'stock 10' buys 10 units of stock, 'stock -5 option 1' trades 2 products, an empty line holds
+    words = line.split()
+    try:
+        return {asset_name: float(unit) for asset_name, unit in zip(words[::2], words[1::2])}
+    except ValueError:
+        print(f'Cannot read "{line}", hold this step')
+        return {}
+
+
+async def _run_human_client(host, port, name, initial_cash):
+    client = await RemoteSessionClient.connect(host, port, name, {'Cash': initial_cash}, 'human')
+    loop = asyncio.get_running_loop()
+    while True:
+        message = await client.next_message()
+        if message['type'] == 'error' and 'time' in message:
+            print(message['message'])
+            continue
+        if message['type'] != 'snapshot':
+            print(message.get('message', 'The session has ended'))
+            break
+        print(f"\nTime={message['time']} prices: {message['prices']}")
+        print(f"Holding: {message['asset']}, total: ${message['holding_value']:.3f}")
+        line = await loop.run_in_executor(None, input, f"Trade within {message['deadline']} s (e.g. stock 10): ")
+        await client.submit(message['time'], _parse_trading_intention(line))
+    await client.close()
+
+
+async def _run_demo_server(port, num_of_steps, step_interval):
+    stock = StockGeometricBrownianMotion('stock', 100, 0, 0.01)
+    server = SessionServer(Market([stock]), step_interval=step_interval, intention_deadline=step_interval)
+    tcp_server = await server.serve_tcp(port=port)
+    print(f'Serving on {tcp_server.sockets[0].getsockname()}, the session starts in {step_interval} s')
+    await asyncio.sleep(step_interval)
+    await server.run(num_of_steps)
+    tcp_server.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='WeTrade trading session')
+    parser.add_argument('command', choices=['serve', 'join'])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--name', default='human')
+    parser.add_argument('--cash', type=float, default=10000)
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=10., help='seconds per step')
+    args = parser.parse_args()
+    if args.command == 'serve':
+        asyncio.run(_run_demo_server(args.port, args.steps, args.interval))
+    else:
+        asyncio.run(_run_human_client(args.host, args.port, args.name, args.cash))
@@ -0,0 +1,63 @@
+import numpy as np
+
+from Source.BlackScholes import implied_volatility
+from Source.Market import FinancialProduct
+
+
+class VolatilitySurface(object):
+    """Annual volatility on a strike x days to expiry grid.
+    Between grid points, volatility is linear in strike, and total variance (volatility^2 * time) is linear in days to
+    expiry. Outside the grid the nearest edge is used.
+    Options created with volatility_surface=... read their volatility here instead of the underlying's flat sigma."""
+
+    def __init__(self, strikes, days_to_expiry, annual_volatility):
+        # annual_volatility has shape (len(strikes), len(days_to_expiry))
+        self.strikes = np.asarray(strikes, dtype=float)
+        self.days_to_expiry = np.asarray(days_to_expiry, dtype=float)
+        self.annual_volatility = np.asarray(annual_volatility, dtype=float)
+        if self.annual_volatility.shape != (len(self.strikes), len(self.days_to_expiry)):
+            raise Exception('annual_volatility should have shape (number of strikes, number of expiries)')
+        if np.any(np.diff(self.strikes) <= 0) or np.any(np.diff(self.days_to_expiry) <= 0):
+            raise Exception('strikes and days_to_expiry should be strictly increasing')
+        if self.days_to_expiry[0] <= 0:
+            raise Exception('days_to_expiry should be positive')
+
+    @classmethod
+    def calibrate(cls, option_prices, spot, strikes, days_to_expiry, is_call=True):
+        """Builds the surface from a chain of option prices of shape (len(strikes), len(days_to_expiry)), with one
+        implied volatility solve over the whole chain. is_call is a bool or a bool array of the same shape."""
+        strikes = np.asarray(strikes, dtype=float)
+        days_to_expiry = np.asarray(days_to_expiry, dtype=float)
+        annual_volatility = implied_volatility(option_prices, spot, strikes[:, np.newaxis],
+                                               days_to_expiry[np.newaxis, :] /
+                                               FinancialProduct.BUSINESS_DAYS_PER_YEAR, is_call)
+        if np.any(np.isnan(annual_volatility)):
+            raise Exception('Some option prices violate no arbitrage bounds, their implied volatility is undefined')
+        return cls(strikes, days_to_expiry, annual_volatility)
+
+    @staticmethod
+    def _interpolation_weights(grid, x):
+        # index of the left grid point and the weight of the right grid point, flat outside the grid
+        x = np.clip(x, grid[0], grid[-1])
+        left_index = np.clip(np.searchsorted(grid, x, side='right') - 1, 0, max(len(grid) - 2, 0))
+        if len(grid) == 1:
+            return left_index, np.zeros_like(x), left_index
+        right_weight = (x - grid[left_index]) / (grid[left_index + 1] - grid[left_index])
+        return left_index, right_weight, left_index + 1
+
+    def check_volatility(self, strike, days_to_expiry):
+        strike, days_to_expiry = np.broadcast_arrays(np.asarray(strike, dtype=float),
+                                                     np.asarray(days_to_expiry, dtype=float))
+        strike_left, strike_weight, strike_right = self._interpolation_weights(self.strikes, strike)
+        expiry_left, expiry_weight, expiry_right = self._interpolation_weights(self.days_to_expiry, days_to_expiry)
+
+        def volatility_at_expiry(expiry_index):
+            return (1 - strike_weight) * self.annual_volatility[strike_left, expiry_index] + \
+                strike_weight * self.annual_volatility[strike_right, expiry_index]
+
+        left_variance = volatility_at_expiry(expiry_left) ** 2 * self.days_to_expiry[expiry_left]
+        right_variance = volatility_at_expiry(expiry_right) ** 2 * self.days_to_expiry[expiry_right]
+        total_variance = (1 - expiry_weight) * left_variance + expiry_weight * right_variance
+        clipped_days_to_expiry = np.clip(days_to_expiry, self.days_to_expiry[0], self.days_to_expiry[-1])
+        volatility = np.sqrt(total_variance / clipped_days_to_expiry)
+        return float(volatility) if volatility.ndim == 0 else volatility
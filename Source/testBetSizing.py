@@ -0,0 +1,59 @@
+from unittest import TestCase
+
+import numpy as np
+
+from Source.Agent import Agent
+from Source.BetSizing import BetSizingOptimizer
+from Source.Market import Market, MockStockGeometricBrownianMotion
+
+
+class TestBetSizingOptimizer(TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.mock_stock = MockStockGeometricBrownianMotion('Stock', 100, 0, 0.01)
+
+    def test_run_same_as_agent(self):
+        num_of_steps = 50
+        price_paths = self.mock_stock.simulate_price_paths(0, num_of_steps, 2)
+        observation_shocks = np.random.standard_normal((2, num_of_steps))
+        sizes, observation_stds = [10, 100], [0.005, 0.02]
+        result = BetSizingOptimizer(self.mock_stock, 10000).run(sizes, observation_stds, price_paths=price_paths,
+                                                                observation_shocks=observation_shocks)
+        self.assertEqual((2, 2, 2), result.sharpe_ratio.shape)
+
+        # the loop of OptimalStockBetSizeResearch.ipynb, with the same prices and observations
+        for i, size in enumerate(sizes):
+            for j, observation_std in enumerate(observation_stds):
+                for path in range(2):
+                    agent_test = Agent('agent_test', {'Cash': 10000, 'Stock': 0})
+                    stock = MockStockGeometricBrownianMotion('Stock', 100, 0, 0.01)
+                    market_test = Market([stock])
+                    for time in range(num_of_steps):
+                        stock.current_value = price_paths[path, time]
+                        predicted_value = price_paths[path, time + 1] * \
+                            np.exp(observation_std * observation_shocks[path, time])
+                        agent_test._trading_intention = {'Stock': size} \
+                            if predicted_value > market_test.check_value('Stock') else {'Stock': -size}
+                        agent_test.trade(market_test, time)
+                        agent_test.mark_holding_values(market_test, time)
+                    self.assertAlmostEqual(agent_test.calculate_average_return(), result.average_return[i, j, path],
+                                           delta=1e-12)
+                    self.assertAlmostEqual(agent_test.calculate_std_return(), result.std_return[i, j, path],
+                                           delta=1e-12)
+                    self.assertAlmostEqual(agent_test.calculate_sharpe_ratio(), result.sharpe_ratio[i, j, path],
+                                           delta=1e-9)
+                    self.assertAlmostEqual(agent_test.calculate_max_drawdown(), result.max_drawdown[i, j, path],
+                                           delta=1e-9)
+
+    def test_kelly_optimal_sizes(self):
+        sizes = np.array([0, 5, 20, 50, 200])
+        result = BetSizingOptimizer(self.mock_stock, 10000).run(sizes, [0.001, 1.], num_of_paths=500)
+        self.assertEqual((5, 2), result.mean('sharpe_ratio').shape)
+        # accurate predictions make money, pure noise does not
+        self.assertGreater(result.mean('average_return')[3, 0], 0)
+        self.assertGreater(result.mean('sharpe_ratio')[3, 0], result.mean('sharpe_ratio')[3, 1])
+        kelly_optimal_sizes = result.kelly_optimal_sizes()
+        self.assertGreater(kelly_optimal_sizes[0], 0)
+        self.assertLess(kelly_optimal_sizes[1], kelly_optimal_sizes[0])
+        # with pure noise, larger bets only lose growth
+        self.assertLess(result.mean('log_growth')[4, 1], result.mean('log_growth')[0, 1])
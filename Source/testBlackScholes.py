@@ -0,0 +1,48 @@
+from unittest import TestCase
+
+import numpy as np
+
+from Source.BlackScholes import black_scholes_price, black_scholes_greeks, implied_volatility
+from Source.Market import StockGeometricBrownianMotion, EuropeanCallOption, EuropeanPutOption
+
+
+class TestBlackScholes(TestCase):
+    def test_price_and_greeks(self):
+        # same as the option classes, for a chain of strikes and both option types
+        stock_test = StockGeometricBrownianMotion('stock_gbm_test', 100, 0, 0.2 / np.sqrt(252))
+        strikes = np.array([80, 90, 100, 110, 120])
+        for option_class, is_call in [(EuropeanCallOption, True), (EuropeanPutOption, False)]:
+            price = black_scholes_price(100, strikes, 30 / 252, 0.2, is_call)
+            delta, gamma, vega = black_scholes_greeks(100, strikes, 30 / 252, 0.2, is_call)
+            for i, strike in enumerate(strikes):
+                option_test = option_class('option_test', [stock_test], strike, 30)
+                self.assertAlmostEqual(option_test.current_value, price[i], delta=1e-9)
+                self.assertAlmostEqual(option_test.delta, delta[i], delta=1e-9)
+                self.assertAlmostEqual(option_test.gamma, gamma[i], delta=1e-9)
+                self.assertAlmostEqual(option_test.vega, vega[i], delta=1e-9)
+
+        # expired options are worth their intrinsic value
+        np.testing.assert_allclose([10, 0], black_scholes_price(100, [90, 110], 0, 0.2))
+        np.testing.assert_allclose([0, 10], black_scholes_price(100, [90, 110], 0, 0.2, is_call=False))
+
+
+class TestImpliedVolatility(TestCase):
+    def test_implied_volatility(self):
+        strikes, years, volatility = np.meshgrid([50, 80, 100, 120, 200], [1 / 252, 0.1, 1, 5],
+                                                 [0.05, 0.2, 0.8, 2.])
+        is_call = strikes >= 100
+        price = black_scholes_price(100, strikes, years, volatility, is_call)
+        solved_volatility = implied_volatility(price, 100, strikes, years, is_call)
+        # prices of deep OTM short dated options carry no information about volatility
+        is_informative = price > 1e-8
+        self.assertGreater(is_informative.sum(), 0.7 * is_informative.size)
+        np.testing.assert_allclose(black_scholes_price(100, strikes, years, solved_volatility, is_call)[is_informative],
+                                   price[is_informative], atol=1e-8)
+        np.testing.assert_allclose(solved_volatility[is_informative & (price > 1e-3)],
+                                   volatility[is_informative & (price > 1e-3)], rtol=1e-5)
+
+    def test_arbitrage_bounds(self):
+        # below intrinsic value, above the spot price, and expired options have no implied volatility
+        solved_volatility = implied_volatility([5, 101, 5, 10], 100, [90, 90, 100, 100], [1, 1, 0, 1])
+        self.assertTrue(np.all(np.isnan(solved_volatility[:3])))
+        self.assertFalse(np.isnan(solved_volatility[3]))
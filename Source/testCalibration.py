@@ -0,0 +1,74 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from Source.Calibration import calibrate_financial_product, calibrate_geometric_brownian_motion, \
+    calibrate_mean_reverting_geometric_brownian_motion, calibrate_stock, \
+    calibrate_trending_geometric_brownian_motion, load_price_array
+from Source.Market import Market, Stock, StockGeometricBrownianMotion, StockMeanRevertingGeometricBrownianMotion, \
+    StockTrendingGeometricBrownianMotion
+
+
+class TestCalibration(TestCase):
+    def setUp(self):
+        np.random.seed(0)
+
+    def test_calibrate_stock(self):
+        stock_test = Stock('stock_test', 100, 0.1, 2)
+        parameters = calibrate_stock(stock_test.simulate_price_paths(0, 2000, 100))
+        self.assertEqual((100,), parameters['mu'].shape)
+        self.assertAlmostEqual(0.1, np.mean(parameters['mu']), delta=0.02)
+        self.assertAlmostEqual(2, np.mean(parameters['sigma']), delta=0.02)
+
+    def test_calibrate_geometric_brownian_motion(self):
+        stock_test = StockGeometricBrownianMotion('stock_test', 100, 0.001, 0.02)
+        paths = stock_test.simulate_price_paths(0, 1000, 5000)
+        parameters = calibrate_geometric_brownian_motion(paths)
+        self.assertEqual((5000,), parameters['sigma'].shape)
+        self.assertAlmostEqual(0.001, np.mean(parameters['mu']), delta=1e-4)
+        self.assertAlmostEqual(0.02, np.mean(parameters['sigma']), delta=1e-4)
+        # a single series gives floats, the same as its row in a batch
+        one_series_parameters = calibrate_geometric_brownian_motion(paths[3])
+        self.assertAlmostEqual(parameters['mu'][3], one_series_parameters['mu'], delta=1e-12)
+        self.assertAlmostEqual(parameters['sigma'][3], one_series_parameters['sigma'], delta=1e-12)
+
+        with self.assertRaises(Exception):
+            calibrate_geometric_brownian_motion([100, 101])
+
+    def test_calibrate_mean_reverting_geometric_brownian_motion(self):
+        stock_test = StockMeanRevertingGeometricBrownianMotion('stock_test', 90, 0, 0.01, 100, 0.001)
+        parameters = calibrate_mean_reverting_geometric_brownian_motion(stock_test.simulate_price_paths(0, 2000, 200))
+        self.assertAlmostEqual(0.01, np.mean(parameters['sigma']), delta=1e-3)
+        self.assertAlmostEqual(0.001, np.median(parameters['mean_reversion_speed']), delta=3e-4)
+        self.assertAlmostEqual(100, np.median(parameters['equilibrium_price']), delta=1)
+
+    def test_calibrate_trending_geometric_brownian_motion(self):
+        stock_test = StockTrendingGeometricBrownianMotion('stock_test', 100, 0, 0.01, 0.3, 0.5)
+        stock_test.mark_current_value_to_record(0)
+        parameters = calibrate_trending_geometric_brownian_motion(stock_test.simulate_price_paths(0, 2000, 100))
+        self.assertAlmostEqual(0.01, np.mean(parameters['sigma']), delta=1e-3)
+        self.assertAlmostEqual(0.3, np.median(parameters['trend_scale_param']), delta=0.05)
+        self.assertAlmostEqual(0.5, np.median(parameters['trend_decay_param']), delta=0.15)
+
+    def test_calibrate_financial_product(self):
+        stock_test = StockGeometricBrownianMotion('stock_test', 100, 0.001, 0.02)
+        market_test = Market([stock_test])
+        for time in range(500):
+            market_test.mark_current_value_to_record(time)
+            market_test.evolve(time + 1)
+        parameters = calibrate_financial_product(stock_test)
+        self.assertAlmostEqual(0.02, parameters['sigma'], delta=2e-3)
+        # calibrated parameters can be passed back to the dynamics class
+        StockGeometricBrownianMotion('stock_calibrated', 100, **parameters)
+
+    def test_load_price_array(self):
+        paths = StockGeometricBrownianMotion('stock_test', 100, 0, 0.02).simulate_price_paths(0, 50, 4)
+        with tempfile.TemporaryDirectory() as directory:
+            npy_path, csv_path = os.path.join(directory, 'prices.npy'), os.path.join(directory, 'prices.csv')
+            np.save(npy_path, paths)
+            np.savetxt(csv_path, paths, delimiter=',')
+            for file_path in [npy_path, csv_path]:
+                parameters = calibrate_geometric_brownian_motion(load_price_array(file_path))
+                np.testing.assert_allclose(calibrate_geometric_brownian_motion(paths)['sigma'], parameters['sigma'])
@@ -0,0 +1,161 @@
+import os
+import pickle
+import random
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from Source.Agent import Agent
+from Source.Checkpoint import CheckpointWriter, load_checkpoint, save_checkpoint
+from Source.Exchange import ImpactMarket, LinearPriceImpact
+from Source.ExoticOption import AsianCallOption
+from Source.Market import StockGeometricBrownianMotion, StockTrendingGeometricBrownianMotion, EuropeanCallOption
+from Source.Population import RandomAIPopulation
+
+
+def make_simulation():
+    stock_gbm = StockGeometricBrownianMotion('stock_gbm', 100, 0, 0.01)
+    stock_trending = StockTrendingGeometricBrownianMotion('stock_trending', 100, 0, 0.01, 0.1, 0.5)
+    market = ImpactMarket([stock_gbm, stock_trending, EuropeanCallOption('option', [stock_gbm], 100, 20),
+                           AsianCallOption('asian_option', [stock_gbm], 100, 20, num_of_trails=100)],
+                          {'stock_gbm': LinearPriceImpact(0.001, 0.001)})
+    agent_list = [Agent(f'agent_{i}', {'Cash': 10000, 'stock_gbm': 10, 'stock_trending': 10})
+                  for i in range(3)]
+    return market, agent_list
+
+
+def run_simulation(market, agent_list, start_time, end_time):
+    for time in range(start_time, end_time):
+        if time > 0:
+            market.evolve(time)
+        market.mark_current_value_to_record(time)
+        for agent in agent_list:
+            # both numpy and python random generators are used, as by RandomAITrader
+            agent._trading_intention = {'stock_gbm': np.random.randint(-2, 3),
+                                        'stock_trending': random.randint(-2, 3)}
+        market.execute(agent_list, time)
+        for agent in agent_list:
+            agent.mark_holding_values(market, time)
+
+
+class TestCheckpoint(TestCase):
+    def setUp(self):
+        self.checkpoint_directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.checkpoint_directory.cleanup()
+
+    def test_save_and_load_checkpoint(self):
+        checkpoint_path = os.path.join(self.checkpoint_directory.name, 'checkpoint.npz')
+        np.random.seed(0)
+        random.seed(0)
+        market, agent_list = make_simulation()
+        run_simulation(market, agent_list, 0, 5)
+        save_checkpoint(checkpoint_path, market, agent_list, 4)
+        run_simulation(market, agent_list, 5, 10)
+
+        np.random.seed(1)  # the restored random states should override these
+        random.seed(1)
+        resumed_market, resumed_agent_list = make_simulation()
+        self.assertEqual(4, load_checkpoint(checkpoint_path, resumed_market, resumed_agent_list))
+        run_simulation(resumed_market, resumed_agent_list, 5, 10)
+
+        for name in ['stock_gbm', 'stock_trending', 'option', 'asian_option']:
+            self.assertEqual(list(market._financial_product_dict[name].price_record.items()),
+                             list(resumed_market._financial_product_dict[name].price_record.items()))
+        self.assertEqual(market.check_delta('option'), resumed_market.check_delta('option'))
+        for agent, resumed_agent in zip(agent_list, resumed_agent_list):
+            self.assertEqual(agent._asset, resumed_agent._asset)
+            self.assertEqual(list(agent.historical_holding_values.items()),
+                             list(resumed_agent.historical_holding_values.items()))
+            self.assertEqual([(record.time, record.asset_name, record.unit) for record in agent._trading_history],
+                             [(record.time, record.asset_name, record.unit)
+                              for record in resumed_agent._trading_history])
+
+        with self.assertRaises(Exception):
+            load_checkpoint(checkpoint_path, resumed_market, resumed_agent_list[:2])
+
+    def test_population(self):
+        def make_population_simulation():
+            market, _ = make_simulation()
+            population = RandomAIPopulation([f'population_agent_{i}' for i in range(50)],
+                                            {'Cash': 10000, 'stock_gbm': 10, 'stock_trending': 10})
+            return market, [Agent('agent', {'Cash': 10000, 'stock_gbm': 10})], population
+
+        def run_population_simulation(market, agent_list, population, start_time, end_time):
+            for time in range(start_time, end_time):
+                if time > 0:
+                    market.evolve(time)
+                market.mark_current_value_to_record(time)
+                population.decision_making()
+                market.execute(agent_list + [population], time)
+                for agent in agent_list + [population]:
+                    agent.mark_holding_values(market, time)
+
+        checkpoint_path = os.path.join(self.checkpoint_directory.name, 'checkpoint.npz')
+        np.random.seed(0)
+        market, agent_list, population = make_population_simulation()
+        run_population_simulation(market, agent_list, population, 0, 5)
+        save_checkpoint(checkpoint_path, market, agent_list + [population], 4)
+        run_population_simulation(market, agent_list, population, 5, 10)
+
+        resumed_market, resumed_agent_list, resumed_population = make_population_simulation()
+        self.assertEqual(4, load_checkpoint(checkpoint_path, resumed_market, resumed_agent_list + [resumed_population]))
+        run_population_simulation(resumed_market, resumed_agent_list, resumed_population, 5, 10)
+
+        self.assertEqual(list(market._financial_product_dict['stock_gbm'].price_record.items()),
+                         list(resumed_market._financial_product_dict['stock_gbm'].price_record.items()))
+        np.testing.assert_array_equal(population._cash, resumed_population._cash)
+        np.testing.assert_array_equal(population._position, resumed_population._position)
+        self.assertEqual(list(population.historical_holding_values), list(resumed_population.historical_holding_values))
+        for values, resumed_values in zip(population.historical_holding_values.values(),
+                                          resumed_population.historical_holding_values.values()):
+            np.testing.assert_array_equal(values, resumed_values)
+        self.assertEqual(10, len(resumed_population._trading_history))
+        for record, resumed_record in zip(population._trading_history, resumed_population._trading_history):
+            self.assertEqual(record.time, resumed_record.time)
+            self.assertEqual(record.asset_names, resumed_record.asset_names)
+            np.testing.assert_array_equal(record.units, resumed_record.units)
+
+    def test_unknown_state(self):
+        # state which can not be stored raises, rather than being silently dropped
+        market, agent_list = make_simulation()
+        agent_list[0].pending_orders = [('stock_gbm', 1)]
+        with self.assertRaises(Exception):
+            save_checkpoint(os.path.join(self.checkpoint_directory.name, 'checkpoint.npz'), market, agent_list, 0)
+
+    def test_checkpoint_size(self):
+        stock = StockGeometricBrownianMotion('stock_gbm', 100, 0, 0.01)
+        market = ImpactMarket([stock], {})
+        for time in range(10000):
+            market.evolve(time)
+            market.mark_current_value_to_record(time)
+        checkpoint_path = os.path.join(self.checkpoint_directory.name, 'checkpoint.npz')
+        save_checkpoint(checkpoint_path, market, [], 9999)
+        # simulated prices are random bits and take 8 bytes each
+        self.assertLess(os.path.getsize(checkpoint_path), 0.4 * len(pickle.dumps(market)))
+
+        np.random.seed(0)
+        market, agent_list = make_simulation()
+        run_simulation(market, agent_list, 0, 300)
+        save_checkpoint(checkpoint_path, market, agent_list, 299)
+        self.assertLess(os.path.getsize(checkpoint_path), 0.25 * len(pickle.dumps((market, agent_list))))
+
+    def test_checkpoint_writer(self):
+        np.random.seed(0)
+        market, agent_list = make_simulation()
+        writer_test = CheckpointWriter(self.checkpoint_directory.name, checkpoint_interval=3)
+        self.assertIsNone(writer_test.latest_checkpoint_path())
+        checkpoint_times = []
+        for time in range(10):
+            run_simulation(market, agent_list, time, time + 1)
+            if writer_test.checkpoint(market, agent_list, time):
+                checkpoint_times.append(time)
+        writer_test.close()
+        self.assertEqual([0, 3, 6, 9], checkpoint_times)
+        self.assertEqual(['checkpoint_6.npz', 'checkpoint_9.npz'], sorted(os.listdir(self.checkpoint_directory.name)))
+
+        resumed_market, resumed_agent_list = make_simulation()
+        self.assertEqual(9, load_checkpoint(writer_test.latest_checkpoint_path(), resumed_market, resumed_agent_list))
+        self.assertEqual(market.check_value('asian_option'), resumed_market.check_value('asian_option'))
@@ -0,0 +1,78 @@
+from unittest import TestCase
+
+import numpy as np
+
+from Source.Agent import Agent
+from Source.Exchange import ImpactMarket, LinearPriceImpact, LimitOrderBook
+from Source.Market import Stock
+from Source.Population import Population
+
+
+class TestLinearPriceImpact(TestCase):
+    def test_price(self):
+        price_impact = LinearPriceImpact(0.01, 0.001)
+        self.assertAlmostEqual(100 * np.exp(0.1), price_impact.execution_price(100, 10), delta=1e-6)
+        self.assertAlmostEqual(100 * np.exp(-0.01), price_impact.price_after_flow(100, -10), delta=1e-6)
+        self.assertEqual(100, price_impact.execution_price(100, 0))
+
+
+class TestLimitOrderBook(TestCase):
+    def test_price(self):
+        order_book = LimitOrderBook(tick_size=0.1, level_depth=10, num_of_levels=3)
+        self.assertAlmostEqual(100.1, order_book.execution_price(100, 5), delta=1e-6)
+        self.assertAlmostEqual(100.1, order_book.price_after_flow(100, 5), delta=1e-6)
+        # 10 units at 100.1, 5 units at 100.2
+        self.assertAlmostEqual((10 * 100.1 + 5 * 100.2) / 15, order_book.execution_price(100, 15), delta=1e-6)
+        self.assertAlmostEqual(100.2, order_book.price_after_flow(100, 15), delta=1e-6)
+        # units beyond the book are filled at the deepest level
+        self.assertAlmostEqual((10 * 99.9 + 10 * 99.8 + 20 * 99.7) / 40, order_book.execution_price(100, -40),
+                               delta=1e-6)
+        self.assertAlmostEqual(99.7, order_book.price_after_flow(100, -40), delta=1e-6)
+
+
+class TestImpactMarket(TestCase):
+    def test_execute(self):
+        market_test = ImpactMarket([Stock('StockTest', 100, 0, 0), Stock('StockNoImpact', 100, 0, 0)],
+                                   {'StockTest': LinearPriceImpact(0.001, 0.0005)})
+        agent_test = Agent('agent_test', {'Cash': 10000, 'StockTest': 0, 'StockNoImpact': 0})
+        population_test = Population(['agent_0', 'agent_1'], {'Cash': 10000, 'StockTest': 0})
+
+        agent_test._trading_intention = {'StockTest': 10, 'StockNoImpact': 10}
+        population_test._trading_intention[:, 0] = [10, -30]
+        market_test.execute([agent_test, population_test], 0)
+
+        # net flow is -10 units, every order is filled at the same price
+        execution_price = 100 * np.exp(0.001 * -10)
+        self.assertAlmostEqual(10000 - 10 * execution_price - 10 * 100, agent_test._asset['Cash'], delta=1e-6)
+        self.assertAlmostEqual(10000 + 30 * execution_price, population_test._cash[1], delta=1e-6)
+        self.assertEqual(100, market_test.check_value('StockTest'))
+
+        # the net flow moves the price before the next evolve
+        market_test.evolve(1)
+        self.assertAlmostEqual(100 * np.exp(0.0005 * -10), market_test.check_value('StockTest'), delta=1e-6)
+        self.assertEqual(100, market_test.check_value('StockNoImpact'))
+        market_test.evolve(2)
+        self.assertAlmostEqual(100 * np.exp(0.0005 * -10), market_test.check_value('StockTest'), delta=1e-6)
+
+        with self.assertRaises(Exception):
+            ImpactMarket([Stock('StockTest', 100, 0, 0)], {'StockOther': LinearPriceImpact(0.001, 0.0005)})
+
+    def test_cancelled_orders_do_not_move_price(self):
+        market_test = ImpactMarket([Stock('s', 100, 0, 0)], {'s': LinearPriceImpact(0.001, 0.001)})
+        unfunded_agent = Agent('unfunded_agent', {'Cash': 0, 's': 0})
+        funded_agent = Agent('funded_agent', {'Cash': 10000, 's': 0})
+        population_test = Population(['agent_0', 'agent_1'], {'Cash': [0, 10000], 's': 0})
+
+        unfunded_agent._trading_intention = {'s': 1000}
+        market_test.execute([unfunded_agent], 0)
+        self.assertEqual(0, unfunded_agent._asset['s'])
+        market_test.evolve(1)
+        self.assertEqual(100, market_test.check_value('s'))
+
+        # only the funded orders of 5 + 3 units move the price
+        funded_agent._trading_intention = {'s': 5}
+        population_test._trading_intention[:, 0] = [1000, 3]
+        market_test.execute([funded_agent, population_test], 1)
+        self.assertEqual([0, 3], list(population_test._position[:, 0]))
+        market_test.evolve(2)
+        self.assertAlmostEqual(100 * np.exp(0.001 * 8), market_test.check_value('s'), delta=1e-9)
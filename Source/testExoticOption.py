@@ -0,0 +1,87 @@
+from unittest import TestCase
+
+import numpy as np
+
+from Source.ExoticOption import AsianCallOption, AsianPutOption, LookbackCallOption, LookbackPutOption, \
+    BarrierCallOption, BarrierPutOption
+from Source.Market import Market, Stock, StockGeometricBrownianMotion, EuropeanCallOption
+from Source.MonteCarlo import MonteCarloPricer
+
+
+class TestAsianOption(TestCase):
+    def test_evolve(self):
+        # Limit Case: no volatility, stock_test increase $1 every day, average of 100, ..., 104 is 102
+        stock_test = Stock('stock_test', 100, 1, 0)
+        option_test = AsianCallOption('option_test', [stock_test], 100, 4, num_of_trails=10)
+        self.assertAlmostEqual(2, option_test.current_value, delta=1e-6)
+        self.assertAlmostEqual(2, option_test.initial_value, delta=1e-6)
+        self.assertAlmostEqual(1, option_test.delta, delta=1e-6)  # additive dynamics shift the whole path
+
+        market_test = Market([stock_test, option_test])
+        for time in range(1, 6):
+            market_test.evolve(time)
+            self.assertAlmostEqual(2, option_test.current_value, delta=1e-6)
+        self.assertEqual(0, option_test.delta)
+        self.assertAlmostEqual(2, option_test.expiry_value, delta=1e-6)
+
+        stock_test = Stock('stock_test', 100, 1, 0)
+        option_test = AsianPutOption('option_test', [stock_test], 103, 4, num_of_trails=10)
+        self.assertAlmostEqual(1, option_test.current_value, delta=1e-6)
+
+    def test_monte_carlo_pricer(self):
+        np.random.seed(0)
+        stock_test = StockGeometricBrownianMotion('stock_gbm_test', 100, 0, 0.2 / np.sqrt(252))
+        option_test = AsianCallOption('option_test', [stock_test], 100, 20, num_of_trails=1e5)
+        result = MonteCarloPricer(max_num_of_trails=1e5).price(option_test)
+        self.assertAlmostEqual(result.estimate, option_test.current_value, delta=4 * result.stderr)
+
+        # averaging reduces volatility, so an Asian option is cheaper than a European option
+        self.assertLess(option_test.current_value, EuropeanCallOption('european', [stock_test], 100, 20).current_value)
+
+
+class TestLookbackOption(TestCase):
+    def test_evolve(self):
+        stock_test = Stock('stock_test', 100, -1, 0)
+        option_test = LookbackCallOption('option_test', [stock_test], 95, 4, num_of_trails=10)
+        self.assertAlmostEqual(5, option_test.current_value, delta=1e-6)  # the max is today's value
+        option_test = LookbackPutOption('option_test', [stock_test], 100, 4, num_of_trails=10)
+        self.assertAlmostEqual(4, option_test.current_value, delta=1e-6)
+
+        market_test = Market([stock_test, option_test])
+        market_test.evolve(1)
+        stock_test.current_value = 200  # the observed minimum is kept
+        market_test.evolve(2)
+        self.assertAlmostEqual(1, option_test.current_value, delta=1e-6)
+
+    def test_evolve_partial_day(self):
+        # 0.1 day before expiry only 0.1 day of drift is left, stock_test increase $10 every day
+        stock_test = Stock('stock_test', 100, 10, 0)
+        option_test = LookbackCallOption('option_test', [stock_test], 100, 1, num_of_trails=10)
+        self.assertAlmostEqual(10, option_test.current_value, delta=1e-6)
+        option_test.evolve(0.9, 0.9)
+        self.assertAlmostEqual(1, option_test.current_value, delta=1e-6)
+
+
+class TestBarrierOption(TestCase):
+    def test_evolve(self):
+        stock_test = Stock('stock_test', 100, 1, 0)
+        option_test = BarrierCallOption('option_test', [stock_test], 100, 4, 103, 'up-and-out', num_of_trails=10)
+        self.assertAlmostEqual(0, option_test.current_value, delta=1e-6)
+        option_test = BarrierCallOption('option_test', [stock_test], 100, 4, 103, 'up-and-in', num_of_trails=10)
+        self.assertAlmostEqual(4, option_test.current_value, delta=1e-6)
+        option_test = BarrierPutOption('option_test', [stock_test], 110, 4, 99, 'down-and-out', num_of_trails=10)
+        self.assertAlmostEqual(6, option_test.current_value, delta=1e-6)
+
+        with self.assertRaises(Exception):
+            BarrierCallOption('option_test', [stock_test], 100, 4, 103, 'sideways-and-out')
+
+    def test_in_out_parity(self):
+        # knock in + knock out = European
+        np.random.seed(0)
+        sigma = 0.2 / np.sqrt(252)
+        stock_test = StockGeometricBrownianMotion('stock_gbm_test', 100, -0.5 * sigma ** 2, sigma)  # Martingale GBM
+        knock_out = BarrierCallOption('knock_out', [stock_test], 100, 20, 105, 'up-and-out', num_of_trails=1e5)
+        knock_in = BarrierCallOption('knock_in', [stock_test], 100, 20, 105, 'up-and-in', num_of_trails=1e5)
+        european = EuropeanCallOption('european', [stock_test], 100, 20)
+        self.assertAlmostEqual(european.current_value, knock_out.current_value + knock_in.current_value, delta=0.1)
+        self.assertAlmostEqual(european.delta, knock_out.delta + knock_in.delta, delta=0.05)
@@ -0,0 +1,74 @@
+import os
+import random
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from Source.Experiment import ExperimentRunner, simulate_delta_hedge_pnl
+
+
+def random_walk_cell(mu, sigma, num_of_steps=10):
+    return float(np.sum(np.random.normal(mu, sigma, num_of_steps)))
+
+
+def python_random_walk_cell(num_of_steps=10):
+    # as RandomAITrader, draws from python's random module
+    return sum(random.randint(-1, 1) for _ in range(num_of_steps))
+
+
+class TestExperimentRunner(TestCase):
+    def setUp(self):
+        self.cache_directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.cache_directory.cleanup()
+
+    def test_expand_grid(self):
+        cells = ExperimentRunner.expand_grid({'mu': [0, 1], 'sigma': [1, 2, 3]})
+        self.assertEqual(6, len(cells))
+        self.assertEqual({'mu': 0, 'sigma': 1}, cells[0])
+        self.assertEqual({'mu': 1, 'sigma': 3}, cells[-1])
+
+    def test_run_with_cache(self):
+        runner_test = ExperimentRunner(random_walk_cell, self.cache_directory.name, num_of_workers=2)
+        cells = runner_test.run({'mu': [0, 1], 'sigma': [1, 2]}, seeds=[0, 1])
+        self.assertEqual(8, len(cells))
+        self.assertFalse(any(cell.is_cached for cell in cells))
+        self.assertEqual(8, len(os.listdir(self.cache_directory.name)))
+        # results do not depend on the worker which runs the cell
+        np.random.seed(1)
+        self.assertAlmostEqual(random_walk_cell(0, 1), cells[1].result, delta=1e-12)
+
+        # only new cells are computed
+        rerun_cells = runner_test.run({'mu': [0, 1, 2], 'sigma': [1, 2]}, seeds=[0, 1])
+        self.assertEqual(8, sum(cell.is_cached for cell in rerun_cells))
+        self.assertEqual([cell.result for cell in cells], [cell.result for cell in rerun_cells[:8]])
+
+        # a new code version invalidates the cache
+        new_version_runner = ExperimentRunner(random_walk_cell, self.cache_directory.name, num_of_workers=1,
+                                              code_version='new version')
+        self.assertFalse(any(cell.is_cached for cell in new_version_runner.run({'mu': [0], 'sigma': [1]})))
+
+        runner_test.clear_cache()
+        self.assertEqual([], os.listdir(self.cache_directory.name))
+
+    def test_python_random_seed(self):
+        runner_test = ExperimentRunner(python_random_walk_cell, self.cache_directory.name, num_of_workers=2)
+        cells = runner_test.run({'num_of_steps': [1000, 2000]}, seeds=[0, 1])
+        for cell in cells:
+            random.seed(cell.seed)
+            self.assertEqual(python_random_walk_cell(**cell.parameters), cell.result)
+
+    def test_simulate_delta_hedge_pnl(self):
+        runner_test = ExperimentRunner(simulate_delta_hedge_pnl, self.cache_directory.name, num_of_workers=1)
+        cells = runner_test.run({'strike': [100], 'num_of_trails': [20],
+                                 'hedging_method': ['daily_delta_hedging', 'no_delta_hedging']})
+        daily_delta_hedging_pnl, no_delta_hedging_pnl = cells[0].result, cells[1].result
+        self.assertEqual(20, len(daily_delta_hedging_pnl))
+        self.assertLess(np.std(daily_delta_hedging_pnl), np.std(no_delta_hedging_pnl))
+
+        with self.assertRaises(Exception):
+            simulate_delta_hedge_pnl(100, 'weekly_delta_hedging', num_of_trails=1)
+        with self.assertRaises(Exception):
+            simulate_delta_hedge_pnl(100, 'daily_delta_hedging', num_of_trails=1, option_type='straddle')
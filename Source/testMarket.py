@@ -1,3 +1,4 @@
+import copy
 from unittest import TestCase
 import numpy as np
 from Source.Market import Stock, Market, StockGeometricBrownianMotion, StockMeanRevertingGeometricBrownianMotion, \
@@ -182,6 +183,21 @@ class TestStockTrendingGeometricBrownianMotion(TestCase):
             stock_test.mark_current_value_to_record(time)
         self.assertAlmostEqual(104.233315, stock_test.check_value(), delta=1e-6)
 
+    def test_simulate_price_moves(self):
+        # as evolving a copy without marking records, simulated values do not enter the trend factor
+        stock_test = StockTrendingGeometricBrownianMotion('stock_trending_gbm_test', 100, 0.01, 0,
+                                                          trend_scale_param=0.1, trend_decay_param=1)
+        for time, value in enumerate([100, 105, 103, 110]):
+            stock_test.current_value = value
+            stock_test.mark_current_value_to_record(time)
+        stock_copy = copy.deepcopy(stock_test)
+        for time in range(4, 14):
+            stock_copy.evolve(time)
+        simulated_future_prices = stock_test.simulate_price_moves(3, 10, 5)
+        self.assertEqual(5, len(simulated_future_prices))
+        self.assertAlmostEqual(stock_copy.current_value, simulated_future_prices[0], delta=1e-9)
+        self.assertEqual(110, stock_test.current_value)
+
 
 class TestMockStockGeometricBrownianMotion(TestCase):
     def test_evolve(self):
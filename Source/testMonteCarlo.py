@@ -0,0 +1,88 @@
+from unittest import TestCase
+
+import numpy as np
+
+from Source.Market import Stock, StockGeometricBrownianMotion, StockTrendingGeometricBrownianMotion, \
+    EuropeanCallOption, EuropeanPutOption
+from Source.MonteCarlo import MonteCarloPricer
+
+
+class TestSimulatePricePaths(TestCase):
+    def test_simulate_price_paths(self):
+        stock_test = Stock('stock_test', 100, 1, 0)  # stock_test increase $1 every day
+        paths = stock_test.simulate_price_paths(0, 10, 5)
+        self.assertEqual((5, 11), paths.shape)
+        self.assertTrue(np.all(paths[:, 0] == 100))
+        self.assertTrue(np.all(paths[:, -1] == 110))
+        self.assertEqual(100, stock_test.current_value)
+
+        stock_test = StockGeometricBrownianMotion('stock_gbm_test', 100, 0.01, 0)
+        paths = stock_test.simulate_price_paths(0, 3, 2)
+        self.assertAlmostEqual(100 * np.exp(0.03), paths[0, -1], delta=1e-6)
+
+    def test_trending_simulate_price_paths(self):
+        # the vectorized trend factor matches marking every evolved value to record
+        stock_test = StockTrendingGeometricBrownianMotion('stock_trending_gbm_test', 100, 0.01, 0,
+                                                          trend_scale_param=0.1, trend_decay_param=1)
+        stock_test.mark_current_value_to_record(0)
+        paths = stock_test.simulate_price_paths(0, 4, 3)
+        self.assertAlmostEqual(104.233315, paths[0, -1], delta=1e-6)
+
+        # the current value which has not been recorded yet also enters the trend factor
+        stock_test = StockTrendingGeometricBrownianMotion('stock_trending_gbm_test', 100, 0.01, 0,
+                                                          trend_scale_param=0.1, trend_decay_param=1)
+        stock_test.mark_current_value_to_record(0)
+        stock_test.current_value = 110
+        paths = stock_test.simulate_price_paths(1, 1, 3)
+        self.assertAlmostEqual(110 * np.exp(0.01 + 0.1 * np.exp(-1) * np.log(1.1)), paths[0, -1], delta=1e-9)
+
+
+class TestMonteCarloPricer(TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        sigma = 0.2 / np.sqrt(252)
+        self.stock = StockGeometricBrownianMotion('stock_gbm', 100, -0.5 * sigma ** 2, sigma)  # Martingale GBM
+        self.call = EuropeanCallOption('call', [self.stock], 100, 20)
+
+    def test_price(self):
+        result = MonteCarloPricer(max_num_of_trails=1e5).price(self.call)
+        self.assertEqual(100000, result.num_of_trails)
+        self.assertAlmostEqual(self.call.current_value, result.estimate, delta=4 * result.stderr)
+
+        put = EuropeanPutOption('put', [self.stock], 100, 20)
+        result = MonteCarloPricer(max_num_of_trails=1e5).price(put)
+        self.assertAlmostEqual(put.current_value, result.estimate, delta=4 * result.stderr)
+
+    def test_variance_reduction(self):
+        plain = MonteCarloPricer(max_num_of_trails=2e4).price(self.call)
+        antithetic = MonteCarloPricer(antithetic=True, max_num_of_trails=2e4).price(self.call)
+        control = MonteCarloPricer(control_variate=True, max_num_of_trails=2e4).price(self.call)
+
+        self.assertLess(antithetic.stderr, plain.stderr)
+        # the control is the option itself, so the estimate is exact
+        self.assertAlmostEqual(self.call.current_value, control.estimate, delta=1e-6)
+        self.assertAlmostEqual(0, control.stderr, delta=1e-6)
+
+        put = EuropeanPutOption('put', [self.stock], 95, 20)
+        plain = MonteCarloPricer(max_num_of_trails=2e4).price(put)
+        control = MonteCarloPricer(antithetic=True, control_variate=True, max_num_of_trails=2e4).price(put)
+        self.assertLess(control.stderr * 10, plain.stderr)
+        self.assertAlmostEqual(put.current_value, control.estimate, delta=4 * control.stderr)
+
+    def test_early_stopping(self):
+        result = MonteCarloPricer(target_stderr=0.05, batch_size=1000, max_num_of_trails=1e6).price(self.call)
+        self.assertLessEqual(result.stderr, 0.05)
+        self.assertLess(result.num_of_trails, 1e6)
+        self.assertEqual(0, result.num_of_trails % 1000)
+
+        # an odd budget leaves an odd last batch, which antithetic pairs round down
+        result = MonteCarloPricer(antithetic=True, batch_size=1000, max_num_of_trails=1001).price(self.call)
+        self.assertEqual(1000, result.num_of_trails)
+        with self.assertRaises(Exception):
+            MonteCarloPricer(antithetic=True, max_num_of_trails=1)
+
+    def test_control_variate_requires_gbm(self):
+        stock_test = Stock('stock_test', 100, 0, 1)
+        option_test = EuropeanCallOption('option_test', [stock_test], 100, 10)
+        with self.assertRaises(Exception):
+            MonteCarloPricer(control_variate=True).price(option_test)
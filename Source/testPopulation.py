@@ -0,0 +1,88 @@
+from unittest import TestCase
+
+import numpy as np
+
+from Source.Agent import Agent
+from Source.Market import Market, Stock
+from Source.Population import Population, RandomAIPopulation
+
+
+class TestPopulation(TestCase):
+    def test_creation(self):
+        population_test = Population(['agent_0', 'agent_1'], {'Cash': [1000, 2000], 'StockTest': 1})
+        self.assertEqual(2, len(population_test))
+        self.assertEqual(['StockTest'], population_test.asset_names)
+        self.assertEqual(2000, population_test._cash[1])
+        self.assertEqual(1, population_test._position[1, 0])
+
+        with self.assertRaises(Exception):
+            Population(['agent_0'], {'StockTest': 1})
+
+    def test_trade(self):
+        population_test = Population(['agent_0', 'agent_1', 'agent_2'], {'Cash': [1000, 1000, 100], 'StockTest': 0})
+        market_test = Market([Stock('StockTest', 100, 0, 0)])
+        population_test._trading_intention[:, 0] = [5, -5, 5]  # agent_2 does not have enough Cash
+        population_test.trade(market_test, 0)
+
+        np.testing.assert_array_equal([500, 1500, 100], population_test._cash)
+        np.testing.assert_array_equal([5, -5, 0], population_test._position[:, 0])
+        np.testing.assert_array_equal([5, -5, 0], population_test._trading_history[0].units[:, 0])
+        np.testing.assert_array_equal([0, 0, 0], population_test._trading_intention[:, 0])
+
+    def test_statistics(self):
+        # a population behaves the same as the same agents traded one by one
+        population_test = Population(['agent_0', 'agent_1'], {'Cash': 10000, 'StockTest': 0})
+        agent_list = [Agent('agent_0', {'Cash': 10000, 'StockTest': 0}),
+                      Agent('agent_1', {'Cash': 10000, 'StockTest': 0})]
+        market_test = Market([Stock('StockTest', 100, 0, 0)])
+
+        for time, units in enumerate([10, -3, 5, -20, 4]):
+            market_test._financial_product_dict['StockTest'].current_value = 100 + (-1) ** time * time ** 2
+            population_test._trading_intention[:, 0] = [units, -units]
+            population_test.trade(market_test, time)
+            population_test.mark_holding_values(market_test, time)
+            for agent, agent_units in zip(agent_list, [units, -units]):
+                agent._trading_intention = {'StockTest': agent_units}
+                agent.trade(market_test, time)
+                agent.mark_holding_values(market_test, time)
+
+        for i, agent in enumerate(agent_list):
+            self.assertAlmostEqual(agent.calculate_average_return(), population_test.calculate_average_return()[i])
+            self.assertAlmostEqual(agent.calculate_std_return(), population_test.calculate_std_return()[i])
+            self.assertAlmostEqual(agent.calculate_sharpe_ratio(), population_test.calculate_sharpe_ratio()[i])
+            self.assertAlmostEqual(agent.calculate_max_drawdown(), population_test.calculate_max_drawdown()[i])
+            self.assertAlmostEqual(agent.calculate_hit_rate(), population_test.calculate_hit_rate()[i])
+            self.assertAlmostEqual(agent.calculate_init_asset_value(market_test),
+                                   population_test.calculate_init_asset_value(market_test)[i])
+
+    def test_agent_view(self):
+        population_test = Population(['agent_0', 'agent_1'], {'Cash': 1000, 'StockTest': 0})
+        market_test = Market([Stock('StockTest', 100, 1, 0)])
+        population_test._trading_intention[1, 0] = 2
+
+        agent_test = population_test.agent('agent_1')
+        self.assertEqual({'StockTest': 2}, dict(agent_test._trading_intention))
+        self.assertEqual({'Cash': 1000, 'StockTest': 0}, dict(agent_test._asset))
+
+        # Agent methods read and write the population arrays
+        agent_test._trading_intention = {'StockTest': 5}
+        agent_test.trade(market_test, 0)
+        self.assertEqual(500, population_test._cash[1])
+        self.assertEqual(5, population_test._position[1, 0])
+        self.assertEqual(0, population_test._trading_intention[1, 0])
+        self.assertEqual(1000, population_test._cash[0])
+
+        market_test.evolve(1)
+        agent_test.evaluate_holding_asset_values(market_test)
+        self.assertEqual(1005, agent_test._holding_asset_value)
+
+
+class TestRandomAIPopulation(TestCase):
+    def test_decision_making(self):
+        np.random.seed(0)
+        population_test = RandomAIPopulation([f'agent_{i}' for i in range(3000)], {'Cash': 1000, 'StockTest': 10})
+        population_test.decision_making()
+        intention = population_test._trading_intention[:, 0]
+        self.assertTrue(set(np.unique(intention)) <= {-5, 0, 5})
+        for units in [-5, 0, 5]:
+            self.assertAlmostEqual(1 / 3, np.mean(intention == units), delta=0.05)
@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from Source.Agent import Agent, DeltaHedger
+from Source.Exchange import ImpactMarket, LinearPriceImpact
+from Source.Market import Market, StockGeometricBrownianMotion, EuropeanCallOption
+from Source.Profiler import SimulationProfiler
+from Source.Scheduler import EventScheduler
+
+
+class TestSimulationProfiler(TestCase):
+    def run_delta_hedging(self):
+        stock_test = StockGeometricBrownianMotion('stock_gbm_test', 100, 0, 1 / np.sqrt(252))
+        option_test = EuropeanCallOption('option_test', [stock_test], 100, 10)
+        market_test = Market([stock_test, option_test])
+        agent_test = DeltaHedger('agent_test', {'Cash': 10000, 'stock_gbm_test': 0, 'option_test': 10})
+        for time in range(1, 6):
+            market_test.evolve(time)
+            market_test.mark_current_value_to_record(time)
+            agent_test.generate_delta_hedging_plans(market_test)
+            agent_test.trade(market_test, time)
+            agent_test.mark_holding_values(market_test, time)
+        agent_test.calculate_sharpe_ratio()
+
+    def test_profile(self):
+        original_market_evolve = Market.evolve
+        original_agent_trade = Agent.trade
+
+        with SimulationProfiler() as profiler:
+            self.assertIsNot(original_market_evolve, Market.evolve)
+            self.run_delta_hedging()
+            with self.assertRaises(Exception):
+                SimulationProfiler().enable()
+
+        # methods are restored once the profiler is disabled
+        self.assertIs(original_market_evolve, Market.evolve)
+        self.assertIs(original_agent_trade, Agent.trade)
+
+        self.assertEqual(5, profiler.phase_statistics['Market.evolve'].num_of_calls)
+        self.assertEqual(5, profiler.phase_statistics['evolve/StockGeometricBrownianMotion'].num_of_calls)
+        # the option is also evolved once when it is created
+        self.assertEqual(6, profiler.phase_statistics['evolve/EuropeanCallOption'].num_of_calls)
+        self.assertEqual(5, profiler.phase_statistics['Agent.trade'].num_of_calls)
+        self.assertEqual(5, profiler.phase_statistics['DeltaHedger.generate_delta_hedging_plans'].num_of_calls)
+        # calculate_sharpe_ratio calls calculate_average_return and calculate_std_return
+        self.assertEqual(1, profiler.phase_statistics['Agent.calculate_average_return'].num_of_calls)
+        self.assertEqual(1, profiler.phase_statistics['Agent.calculate_sharpe_ratio'].num_of_calls)
+        self.assertEqual([1, 2, 3, 4, 5], list(profiler.step_records)[-5:])
+        self.assertGreater(profiler.step_records[3]['evolve/EuropeanCallOption'], 0)
+
+        statistics = profiler.phase_statistics['Market.evolve']
+        self.assertEqual(5, statistics.histogram.sum())
+        self.assertLessEqual(statistics.quantile(0.5), statistics.quantile(0.99))
+        self.assertLessEqual(statistics.quantile(0.99), statistics.max_seconds)
+
+        summary_table = profiler.summary_table()
+        self.assertIn('Market.evolve', summary_table)
+        self.assertIn('evolve/EuropeanCallOption', summary_table)
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, 'trace.json')
+            profiler.export_chrome_trace(file_path)
+            with open(file_path) as f:
+                trace_events = json.load(f)['traceEvents']
+        self.assertEqual(sum(statistics.num_of_calls for statistics in profiler.phase_statistics.values()),
+                         len(trace_events))
+        self.assertEqual('X', trace_events[0]['ph'])
+
+    def test_profile_scheduler_and_matching(self):
+        stock_test = StockGeometricBrownianMotion('stock_gbm_test', 100, 0, 0.01)
+        market_test = ImpactMarket([stock_test], {'stock_gbm_test': LinearPriceImpact(0.001, 0.001)})
+        agent_test = Agent('agent_test', {'Cash': 10000, 'stock_gbm_test': 0})
+        scheduler_test = EventScheduler(market_test)
+        scheduler_test.schedule_financial_product('stock_gbm_test', 0.5)
+
+        def trade(market, time):
+            agent_test._trading_intention = {'stock_gbm_test': 1}
+            market.execute([agent_test], time)
+
+        scheduler_test.schedule_agent(trade, 1)
+        with SimulationProfiler() as profiler:
+            scheduler_test.run(3)
+
+        # steps follow the times at which the scheduler evolves products
+        self.assertEqual([0.5, 1, 1.5, 2, 2.5, 3], list(profiler.step_records))
+        self.assertEqual(6, profiler.phase_statistics['Market.evolve_financial_product'].num_of_calls)
+        self.assertGreater(profiler.step_records[1.5]['evolve/StockGeometricBrownianMotion'], 0)
+        # matching of the price impact market is a phase of its own
+        self.assertEqual(3, profiler.phase_statistics['ImpactMarket.execute'].num_of_calls)
+        self.assertEqual(3, profiler.phase_statistics['ImpactMarket.match'].num_of_calls)
+        self.assertGreater(profiler.step_records[2]['ImpactMarket.match'], 0)
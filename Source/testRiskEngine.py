@@ -0,0 +1,93 @@
+import copy
+from unittest import TestCase
+
+import numpy as np
+
+from Source.Agent import Agent
+from Source.ExoticOption import AsianCallOption
+from Source.Market import Market, StockGeometricBrownianMotion, EuropeanCallOption, EuropeanPutOption
+from Source.RiskEngine import RiskEngine, expected_shortfall, value_at_risk
+
+
+class TestRiskEngine(TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.stock_a = StockGeometricBrownianMotion('stock_a', 100, 0, 0.01)
+        self.stock_b = StockGeometricBrownianMotion('stock_b', 50, 0, 0.02)
+        self.market = Market([self.stock_a, self.stock_b,
+                              EuropeanCallOption('call_a', [self.stock_a], 105, 20),
+                              EuropeanPutOption('put_b', [self.stock_b], 50, 60),
+                              AsianCallOption('asian_a', [self.stock_a], 100, 10, num_of_trails=1000)])
+        self.agent = Agent('agent', {'Cash': 1000, 'stock_a': 5, 'call_a': -10, 'put_b': 20, 'asian_a': 3})
+
+    def test_revalue(self):
+        engine_test = RiskEngine.from_agent(self.market, self.agent)
+        self.assertEqual(['stock_a', 'stock_b'], engine_test.underlying_names)
+        self.agent.evaluate_holding_asset_values(self.market)
+        self.assertAlmostEqual(self.agent._holding_asset_value, engine_test.base_value, delta=1e-9)
+
+        # a scenario is the same as moving the market and repricing every option
+        spot_multipliers = np.array([[1.05, 0.9], [1, 1]])
+        values = engine_test.revalue(spot_multipliers)
+        shocked_market = copy.deepcopy(self.market)
+        shocked_market._financial_product_dict['stock_a'].current_value *= 1.05
+        shocked_market._financial_product_dict['stock_b'].current_value *= 0.9
+        for option_name in ['call_a', 'put_b']:
+            shocked_market.evolve_financial_product(option_name, 0)
+        asian_option = self.market._financial_product_dict['asian_a']
+        expected_value = 1000 + 5 * 105 - 10 * shocked_market.check_value('call_a') + \
+            20 * shocked_market.check_value('put_b') + 3 * (asian_option.current_value + asian_option.delta * 5)
+        self.assertAlmostEqual(expected_value, values[0], delta=1e-9)
+        self.assertAlmostEqual(engine_test.base_value, values[1], delta=1e-9)
+
+        spot_multipliers, vol_shifts = engine_test.grid_scenarios([0], [-0.05, 0, 0.05])
+        self.assertEqual((3, 2), vol_shifts.shape)
+        report = engine_test.run(spot_multipliers, vol_shifts)
+        self.assertAlmostEqual(0, report.pnl[1], delta=1e-9)
+
+        # higher volatility makes the short call lose and the long put gain
+        short_call_engine = RiskEngine(self.market, {'call_a': -10})
+        report = short_call_engine.run(*short_call_engine.grid_scenarios([0], [-0.05, 0, 0.05]))
+        self.assertLess(report.pnl[2], 0)
+        self.assertLess(0, report.pnl[0])
+        long_put_engine = RiskEngine(self.market, {'put_b': 20})
+        report = long_put_engine.run(*long_put_engine.grid_scenarios([0], [-0.05, 0, 0.05]))
+        self.assertLess(0, report.pnl[2])
+        self.assertLess(report.pnl[0], 0)
+
+        # time decay
+        self.assertNotAlmostEqual(0, engine_test.run(np.ones((1, 2)), horizon=5).pnl[0], delta=1e-3)
+
+    def test_value_at_risk(self):
+        pnl = np.arange(-50, 50)
+        self.assertAlmostEqual(49.01, value_at_risk(pnl, 0.99), delta=1e-9)
+        self.assertAlmostEqual(50, expected_shortfall(pnl, 0.99), delta=1e-9)
+        self.assertAlmostEqual(48, expected_shortfall(pnl, 0.95), delta=1e-9)
+
+        engine_test = RiskEngine.from_agent(self.market, self.agent)
+        scenarios = engine_test.simulated_scenarios(self.market, 5, 10000)
+        report = engine_test.run(scenarios)
+        self.assertEqual((10000,), report.pnl.shape)
+        # options are repriced at the horizon of the simulated moves
+        np.testing.assert_array_equal(engine_test.revalue(scenarios.spot_multipliers, horizon=5),
+                                      report.pnl + report.base_value)
+        with self.assertRaises(Exception):
+            engine_test.run(scenarios, horizon=0)
+        self.assertGreater(report.value_at_risk(0.99), 0)
+        self.assertGreaterEqual(report.expected_shortfall(0.99), report.value_at_risk(0.99))
+
+    def test_greek_ladder(self):
+        engine_test = RiskEngine(self.market, {'Cash': 0, 'stock_a': 5, 'call_a': -10, 'put_b': 20})
+        ladder = engine_test.greek_ladder([-0.1, 0, 0.1])
+        self.assertEqual((2, 3), ladder['delta'].shape)
+        self.assertAlmostEqual(5 - 10 * self.market.check_delta('call_a'), ladder['delta'][0, 1], delta=1e-9)
+        self.assertAlmostEqual(20 * self.market.check_delta('put_b'), ladder['delta'][1, 1], delta=1e-9)
+        self.assertLess(ladder['delta'][0, 2], ladder['delta'][0, 0])  # short call gamma
+        self.assertAlmostEqual(20 * self.market._financial_product_dict['put_b'].vega, ladder['vega'][1, 1],
+                               delta=1e-9)
+
+        vega_buckets = engine_test.vega_buckets([0, 30, 90])
+        self.assertAlmostEqual(-10 * self.market._financial_product_dict['call_a'].vega, vega_buckets[0, 0],
+                               delta=1e-9)
+        self.assertAlmostEqual(0, vega_buckets[0, 1], delta=1e-9)
+        self.assertAlmostEqual(ladder['vega'][1, 1], vega_buckets[1, 1], delta=1e-9)
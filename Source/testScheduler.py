@@ -0,0 +1,92 @@
+from unittest import TestCase
+
+import numpy as np
+
+from Source.ExoticOption import AsianCallOption
+from Source.Market import Market, Stock, StockGeometricBrownianMotion, EuropeanCallOption, EuropeanPutOption
+from Source.Scheduler import EventScheduler
+
+
+class TestEventScheduler(TestCase):
+    def test_run(self):
+        daily_stock = Stock('daily_stock', 100, 1, 0)  # increase $1 every day
+        intraday_stock = Stock('intraday_stock', 100, 1, 0)
+        market_test = Market([daily_stock, intraday_stock])
+        scheduler_test = EventScheduler(market_test)
+        scheduler_test.schedule_financial_product('daily_stock', 1)
+        scheduler_test.schedule_financial_product('intraday_stock', 0.1)
+
+        observed_values = []
+        scheduler_test.schedule_agent(lambda market, time: observed_values.append(
+            (time, market.check_value('daily_stock'), market.check_value('intraday_stock'))), 0.5)
+
+        scheduler_test.run(2)
+        self.assertEqual(2 + 20, scheduler_test.num_of_evolve_calls)
+        # mu is scaled to the actual dt, both stocks move $1 per day
+        self.assertAlmostEqual(102, daily_stock.current_value, delta=1e-6)
+        self.assertAlmostEqual(102, intraday_stock.current_value, delta=1e-6)
+
+        # products due at the same time are evolved before agents wake up
+        self.assertEqual(4, len(observed_values))
+        self.assertEqual((0.5, 100), observed_values[0][:2])
+        self.assertAlmostEqual(100.5, observed_values[0][2], delta=1e-6)
+        self.assertEqual((1, 101), observed_values[1][:2])
+        self.assertAlmostEqual(101, observed_values[1][2], delta=1e-6)
+
+        scheduler_test.run(3)
+        self.assertAlmostEqual(103, intraday_stock.current_value, delta=1e-6)
+
+    def test_volatility_scaling(self):
+        np.random.seed(0)
+        final_values = []
+        for _ in range(2000):
+            stock_test = StockGeometricBrownianMotion('stock_gbm_test', 100, 0, 0.01)
+            scheduler_test = EventScheduler(Market([stock_test]))
+            scheduler_test.schedule_financial_product('stock_gbm_test', 0.25)
+            scheduler_test.run(4)
+            final_values.append(np.log(stock_test.current_value / 100))
+        self.assertAlmostEqual(0.01 * np.sqrt(4), np.std(final_values), delta=0.002)
+
+    def test_option_update(self):
+        stock_test = StockGeometricBrownianMotion('stock_gbm_test', 100, 0, 1 / np.sqrt(252))
+        option_test = EuropeanCallOption('option_test', [stock_test], 100, 252)
+        scheduler_test = EventScheduler(Market([stock_test, option_test]))
+        scheduler_test.schedule_financial_product('option_test', 0.5)
+        scheduler_test.run(126)
+        # the underlying never moves, only time to maturity decreases
+        expected_option = EuropeanCallOption('expected_option', [stock_test], 100, 126)
+        self.assertAlmostEqual(expected_option.current_value, option_test.current_value, delta=1e-6)
+
+        with self.assertRaises(Exception):
+            scheduler_test.schedule_financial_product('stock_not_in_market', 1)
+
+    def test_option_expiry_between_updates(self):
+        stock_test = StockGeometricBrownianMotion('stock_gbm_test', 110, 0, 0.01)
+        call_test = EuropeanCallOption('call_test', [stock_test], 100, 1)
+        put_test = EuropeanPutOption('put_test', [stock_test], 120, 1)
+        scheduler_test = EventScheduler(Market([stock_test, call_test, put_test]))
+        scheduler_test.schedule_financial_product('call_test', 0.3)
+        scheduler_test.schedule_financial_product('put_test', 0.3)
+        # updates at 0.9 and 1.2 step over the expiry, options settle at 1.2
+        scheduler_test.run(1.2)
+        self.assertEqual(10, call_test.current_value)
+        self.assertEqual(10, put_test.current_value)
+        self.assertEqual(0, call_test.delta)
+
+        # settled values do not move with the underlying afterwards
+        stock_test.current_value = 130
+        scheduler_test.run(2)
+        self.assertEqual(10, call_test.current_value)
+        self.assertEqual(10, put_test.current_value)
+
+    def test_path_dependent_option_expiry_between_updates(self):
+        stock_test = StockGeometricBrownianMotion('stock_gbm_test', 110, 0, 0.01)
+        option_test = AsianCallOption('option_test', [stock_test], 100, 1, num_of_trails=10)
+        scheduler_test = EventScheduler(Market([stock_test, option_test]))
+        scheduler_test.schedule_financial_product('option_test', 0.3)
+        # the underlying never moves, every observation is 110
+        scheduler_test.run(1.2)
+        self.assertAlmostEqual(10, option_test.current_value, delta=1e-9)
+        self.assertEqual(0, option_test.delta)
+        scheduler_test.run(2)
+        self.assertAlmostEqual(10, option_test.current_value, delta=1e-9)
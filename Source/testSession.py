@@ -0,0 +1,127 @@
+import asyncio
+import contextlib
+import io
+from unittest import IsolatedAsyncioTestCase
+
+import numpy as np
+
+from Source.Exchange import ImpactMarket, LinearPriceImpact
+from Source.Market import Market, Stock, StockGeometricBrownianMotion
+from Source.Session import RemoteSessionClient, SessionServer, run_scripted_client
+
+
+def buy_one_stock(snapshot):
+    return {'stock': 1}
+
+
+class TestSessionServer(IsolatedAsyncioTestCase):
+    def setUp(self):
+        np.random.seed(0)
+
+    async def test_many_scripted_clients(self):
+        server_test = SessionServer(Market([Stock('stock', 100, 0, 1)]), intention_deadline=5)
+        clients = [server_test.connect(f'client_{i}', {'Cash': 10000}) for i in range(300)]
+        session = asyncio.create_task(server_test.run(5))
+        num_of_snapshots = await asyncio.gather(*[run_scripted_client(client, buy_one_stock) for client in clients])
+        await session
+        self.assertEqual([5] * 300, num_of_snapshots)
+        self.assertEqual(5, server_test.check_agent('client_7')._asset['stock'])
+        self.assertEqual([0, 1, 2, 3, 4], list(server_test.check_agent('client_7').historical_holding_values))
+        self.assertEqual(5, len(server_test.step_latencies))
+        # every client answered, so no step waited for the deadline
+        self.assertLess(max(server_test.step_latencies), 1)
+
+    async def test_intention_deadline(self):
+        server_test = SessionServer(Market([Stock('stock', 100, 0, 1)]), intention_deadline=0.05)
+        active_client = server_test.connect('active', {'Cash': 10000})
+        silent_client = server_test.connect('silent', {'Cash': 10000, 'stock': 3})
+        session = asyncio.create_task(server_test.run(2))
+        self.assertEqual(2, await run_scripted_client(active_client, lambda snapshot: {'stock': 2, 'bond': 1}))
+        await session
+        self.assertEqual(4, server_test.check_agent('active')._asset['stock'])
+        self.assertNotIn('bond', server_test.check_agent('active')._asset)
+        self.assertEqual(3, server_test.check_agent('silent')._asset['stock'])
+        self.assertGreaterEqual(min(server_test.step_latencies), 0.05)
+        # late intentions are rejected
+        self.assertFalse(await silent_client.submit(0, {'stock': 1}))
+
+    async def test_invalid_units(self):
+        server_test = SessionServer(Market([Stock('stock', 100, 0, 1)]), intention_deadline=0.05)
+        string_client = server_test.connect('string', {'Cash': 10000})
+        infinite_client = server_test.connect('infinite', {'Cash': 10000})
+        valid_client = server_test.connect('valid', {'Cash': 10000})
+        session = asyncio.create_task(server_test.run(2))
+        results = await asyncio.gather(run_scripted_client(string_client, lambda snapshot: {'stock': '10'}),
+                                       run_scripted_client(infinite_client, lambda snapshot: {'stock': -np.inf}),
+                                       run_scripted_client(valid_client, buy_one_stock))
+        await session
+        # the session has ended normally, bad units only cancel their own intentions
+        self.assertEqual([2, 2, 2], results)
+        self.assertEqual({'Cash': 10000}, server_test.check_agent('string')._asset)
+        self.assertEqual({'Cash': 10000}, server_test.check_agent('infinite')._asset)
+        self.assertEqual(2, server_test.check_agent('valid')._asset['stock'])
+        with self.assertRaises(Exception):
+            server_test.connect('bad_cash', {'Cash': 'a lot'})
+        with self.assertRaises(Exception):
+            server_test.connect('robot', {'Cash': 10000}, agent_type='robot')
+
+    async def test_snapshot_holding_value(self):
+        server_test = SessionServer(Market([Stock('stock', 100, 0, 1)]), intention_deadline=5)
+        client = server_test.connect('holder', {'Cash': 0, 'stock': 1})
+        snapshots = []
+        session = asyncio.create_task(server_test.run(3))
+        await run_scripted_client(client, lambda snapshot: snapshots.append(snapshot) or {})
+        await session
+        # the holding value is marked at the prices sent with it, not at the previous step's prices
+        self.assertEqual(3, len(snapshots))
+        for snapshot in snapshots:
+            self.assertEqual(snapshot['prices']['stock'], snapshot['holding_value'])
+
+    async def test_human_clients_do_not_print_on_server(self):
+        server_test = SessionServer(Market([Stock('stock', 100, 0, 1)]), intention_deadline=5)
+        human_client = server_test.connect('human', {'Cash': 10000}, agent_type='human')
+        session = asyncio.create_task(server_test.run(2))
+        with contextlib.redirect_stdout(io.StringIO()) as server_output:
+            await run_scripted_client(human_client, buy_one_stock)
+            await session
+        self.assertEqual('', server_output.getvalue())
+        self.assertEqual('human', server_test.check_agent_type('human'))
+        self.assertEqual(2, server_test.check_agent('human')._asset['stock'])
+
+    async def test_batch_execution_with_price_impact(self):
+        market_test = ImpactMarket([StockGeometricBrownianMotion('stock', 100, 0, 0.01)],
+                                   {'stock': LinearPriceImpact(0.001, 0.001)})
+        server_test = SessionServer(market_test, intention_deadline=5)
+        clients = [server_test.connect(f'client_{i}', {'Cash': 10000}) for i in range(10)]
+        session = asyncio.create_task(server_test.run(1))
+        await asyncio.gather(*[run_scripted_client(client, buy_one_stock) for client in clients])
+        await session
+        # all clients are filled at the price of the net flow of 10 units
+        execution_price = 100 * np.exp(0.001 * 10)
+        for i in range(10):
+            self.assertAlmostEqual(10000 - execution_price, server_test.check_agent(f'client_{i}')._asset['Cash'],
+                                   delta=1e-9)
+
+    async def test_tcp_clients(self):
+        server_test = SessionServer(Market([Stock('stock', 100, 0, 1)]), intention_deadline=0.5)
+        tcp_server = await server_test.serve_tcp()
+        host, port = tcp_server.sockets[0].getsockname()[:2]
+        clients = [await RemoteSessionClient.connect(host, port, f'remote_{i}', {'Cash': 10000}) for i in range(3)]
+        while len(server_test._clients) < 3:
+            await asyncio.sleep(0.01)
+        # a second client with the same name is refused
+        duplicate_client = await RemoteSessionClient.connect(host, port, 'remote_0', {'Cash': 10000})
+        self.assertEqual('error', (await duplicate_client.next_message())['type'])
+        await duplicate_client.close()
+        session = asyncio.create_task(server_test.run(3))
+        strategies = [buy_one_stock, buy_one_stock, lambda snapshot: {'stock': '10'}]
+        self.assertEqual([3, 3, 3], await asyncio.gather(*[run_scripted_client(client, strategy)
+                                                           for client, strategy in zip(clients, strategies)]))
+        await session
+        for client in clients:
+            await client.close()
+        tcp_server.close()
+        await tcp_server.wait_closed()
+        self.assertEqual(3, server_test.check_agent('remote_1')._asset['stock'])
+        self.assertEqual({'Cash': 10000}, server_test.check_agent('remote_2')._asset)
+        self.assertEqual('ai', server_test.check_agent_type('remote_2'))
@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+import numpy as np
+
+from Source.BlackScholes import black_scholes_price
+from Source.Market import StockGeometricBrownianMotion, EuropeanCallOption, EuropeanPutOption
+from Source.VolatilitySurface import VolatilitySurface
+
+
+class TestVolatilitySurface(TestCase):
+    def test_check_volatility(self):
+        surface_test = VolatilitySurface([90, 110], [10, 40], [[0.3, 0.2], [0.2, 0.1]])
+        self.assertAlmostEqual(0.3, surface_test.check_volatility(90, 10), delta=1e-9)
+        self.assertAlmostEqual(0.25, surface_test.check_volatility(100, 10), delta=1e-9)
+        # flat outside the grid
+        self.assertAlmostEqual(0.1, surface_test.check_volatility(200, 100), delta=1e-9)
+        # total variance is linear in days to expiry
+        self.assertAlmostEqual(np.sqrt((0.3 ** 2 * 10 + 0.2 ** 2 * 40) / 2 / 25), surface_test.check_volatility(90, 25),
+                               delta=1e-9)
+        np.testing.assert_allclose([0.3, 0.2], surface_test.check_volatility([90, 110], [10, 10]))
+
+        with self.assertRaises(Exception):
+            VolatilitySurface([110, 90], [10, 40], [[0.3, 0.2], [0.2, 0.1]])
+        with self.assertRaises(Exception):
+            VolatilitySurface([90, 110], [10, 40], [0.3, 0.2])
+
+    def test_calibrate(self):
+        strikes = np.array([80, 90, 100, 110, 120])
+        days_to_expiry = np.array([5, 21, 63, 252])
+        annual_volatility = 0.2 + 0.001 * (strikes[:, np.newaxis] - 100) ** 2 / days_to_expiry[np.newaxis, :]
+        is_call = np.broadcast_to(strikes[:, np.newaxis] >= 100, annual_volatility.shape)
+        option_prices = black_scholes_price(100, strikes[:, np.newaxis], days_to_expiry / 252, annual_volatility,
+                                            is_call)
+        surface_test = VolatilitySurface.calibrate(option_prices, 100, strikes, days_to_expiry, is_call)
+        np.testing.assert_allclose(annual_volatility, surface_test.annual_volatility, rtol=1e-6)
+
+        # options read the surface in place of the underlying's sigma
+        stock_test = StockGeometricBrownianMotion('stock_gbm_test', 100, 0, 0.5 / np.sqrt(252))
+        option_test = EuropeanPutOption('option_test', [stock_test], 90, 21, volatility_surface=surface_test)
+        self.assertAlmostEqual(option_prices[1, 1], option_test.current_value, delta=1e-6)
+        option_test = EuropeanCallOption('option_test', [stock_test], 110, 73, volatility_surface=surface_test)
+        option_test.evolve(10)
+        self.assertAlmostEqual(option_prices[3, 2], option_test.current_value, delta=1e-6)
+
+        with self.assertRaises(Exception):
+            VolatilitySurface.calibrate(np.full((5, 4), 200.), 100, strikes, days_to_expiry)